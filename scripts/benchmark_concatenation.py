@@ -0,0 +1,98 @@
+#!/usr/bin/env -S uv run python
+"""Compare time and peak RSS of pydub vs NumPy crossfade concatenation.
+
+Each path runs in a fresh process on synthetic 24 kHz mono chunks, like
+the ones the TTS model returns, so peak RSS is not shared between them.
+
+    uv run python scripts/benchmark_concatenation.py --chunks 10 50 100
+"""
+
+import argparse
+import io
+import multiprocessing
+import resource
+import time
+import wave
+
+SAMPLE_RATE = 24_000
+CROSSFADE_MS = 50
+
+
+def make_chunks(count: int, seconds: float) -> list[bytes]:
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    chunks = []
+    for _ in range(count):
+        frames = int(SAMPLE_RATE * seconds * rng.uniform(0.5, 1.5))
+        samples = (rng.standard_normal(frames) * 3000).astype("<i2")
+        output = io.BytesIO()
+        with wave.open(output, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(SAMPLE_RATE)
+            f.writeframes(samples.tobytes())
+        chunks.append(output.getvalue())
+    return chunks
+
+
+def pydub_path(chunks: list[bytes]) -> int:
+    from pydub import AudioSegment
+
+    combined = AudioSegment.from_wav(io.BytesIO(chunks[0]))
+    for chunk in chunks[1:]:
+        segment = AudioSegment.from_wav(io.BytesIO(chunk))
+        combined = combined.append(segment, crossfade=CROSSFADE_MS)
+    output = io.BytesIO()
+    combined.export(output, format="wav")
+    return len(output.getvalue())
+
+
+def numpy_path(chunks: list[bytes]) -> int:
+    from podcaster.audio import concatenate_wav
+
+    return len(concatenate_wav(chunks, CROSSFADE_MS))
+
+
+PATHS = {"pydub": pydub_path, "numpy": numpy_path}
+
+
+def run(name: str, count: int, seconds: float, results):
+    import pydub  # noqa: F401  # keep imports out of the timing
+
+    import podcaster.audio  # noqa: F401
+
+    chunks = make_chunks(count, seconds)
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    size = PATHS[name](chunks)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results[name] = (elapsed, (peak_kb - baseline_kb) / 1024, size)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--seconds", type=float, default=30)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    for count in args.chunks:
+        results = ctx.Manager().dict()
+        for name in PATHS:
+            process = ctx.Process(
+                target=run, args=(name, count, args.seconds, results)
+            )
+            process.start()
+            process.join()
+        print(f"{count} chunks of ~{args.seconds:.0f}s:")
+        for name, (elapsed, peak_mb, size) in results.items():
+            print(
+                f"{name:>8}: {elapsed:6.2f}s, +{peak_mb:7.1f} MB peak RSS, "
+                f"{size / 1e6:.1f} MB WAV"
+            )
+
+
+if __name__ == "__main__":
+    main()
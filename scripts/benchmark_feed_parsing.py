@@ -0,0 +1,117 @@
+#!/usr/bin/env -S uv run python
+"""Compare parse time and peak RSS of feedparser vs streaming feed parsing.
+
+Each path runs in a fresh process on a synthetic Atom feed, so peak RSS
+is not shared between them.
+
+    uv run python scripts/benchmark_feed_parsing.py --entries 5000
+"""
+
+import argparse
+import multiprocessing
+import resource
+import time
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import escape
+
+PARAGRAPH = "<p>" + "Lorem ipsum dolor sit amet, consectetur. " * 20 + "</p>"
+
+
+def make_feed(entries: int, paragraphs: int) -> bytes:
+    start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    items = []
+    for i in range(entries):
+        published = (start + timedelta(hours=i)).isoformat()
+        content = escape(PARAGRAPH * paragraphs)
+        items.append(
+            f"<entry><title>Post {i}</title>"
+            f'<link href="https://example.com/{i}" rel="alternate"/>'
+            f"<id>https://example.com/{i}</id>"
+            f"<published>{published}</published>"
+            f"<summary>Summary {i}</summary>"
+            f'<content type="html">{content}</content></entry>'
+        )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom"><title>Bench</title>'
+        + "".join(items)
+        + "</feed>"
+    ).encode()
+
+
+def feedparser_path(feed_content: bytes, limit: int):
+    import feedparser
+
+    from podcaster.parser import ParsedArticle
+
+    feed = feedparser.parse(feed_content)
+    articles = [
+        ParsedArticle(
+            title=fe.title,
+            summary=fe.summary,
+            link=fe.link,
+            content=fe.content[0].value,
+            date_as_str=fe.published,
+        )
+        for fe in feed.entries
+    ]
+    articles = sorted(articles, key=lambda x: x.date)
+    for index, article in enumerate(articles):
+        article.number = index + 1
+    return [a for a in articles if a.is_valid][-limit:]
+
+
+def streaming_path(feed_content: bytes, limit: int):
+    from podcaster.parser import parse_articles
+
+    return parse_articles(feed_content, limit=limit)
+
+
+PATHS = {"feedparser": feedparser_path, "streaming": streaming_path}
+
+
+def run(name: str, feed_content: bytes, limit: int, results):
+    import podcaster.parser  # noqa: F401  # keep imports out of the timing
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    articles = PATHS[name](feed_content, limit)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results[name] = (
+        elapsed,
+        (peak_kb - baseline_kb) / 1024,
+        [(a.number, a.id) for a in articles],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--paragraphs", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=25)
+    args = parser.parse_args()
+
+    feed_content = make_feed(args.entries, args.paragraphs)
+    print(
+        f"Feed: {args.entries} entries, {len(feed_content) / 1e6:.1f} MB, "
+        f"keeping the newest {args.limit}"
+    )
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Manager().dict()
+    for name in PATHS:
+        process = ctx.Process(
+            target=run, args=(name, feed_content, args.limit, results)
+        )
+        process.start()
+        process.join()
+
+    for name, (elapsed, peak_mb, _) in results.items():
+        print(f"{name:>10}: {elapsed:6.2f}s, +{peak_mb:7.1f} MB peak RSS")
+    same = results["feedparser"][2] == results["streaming"][2]
+    print(f"Same articles and numbers: {same}")
+
+
+if __name__ == "__main__":
+    main()
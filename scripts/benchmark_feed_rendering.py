@@ -0,0 +1,70 @@
+#!/usr/bin/env -S uv run python
+"""Time podcast feed rendering for a large back catalog.
+
+Compares rebuilding the whole feed through feedgen with the cached
+renderer, both cold and after a single new episode.
+
+    uv run python scripts/benchmark_feed_rendering.py --episodes 10000
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from feedgen.feed import FeedGenerator
+
+from podcaster.parser import ParsedArticle
+from podcaster.podcast_feed import PodcastFeedRenderer, _feed_generator
+
+
+def make_article(number: int) -> ParsedArticle:
+    date = datetime(2015, 1, 1, tzinfo=timezone.utc) + timedelta(days=number)
+    article = ParsedArticle(
+        title=f"Episode {number}",
+        summary=f"<p>Summary of episode {number}. " + "Words. " * 40 + "</p>",
+        link=f"https://example.com/blog/{number}",
+        content="<p>" + "Body text. " * 20 + "</p>",
+        date_as_str=date.isoformat(),
+    )
+    article.number = number
+    return article
+
+
+def full_rebuild(articles) -> bytes:
+    fg: FeedGenerator = _feed_generator()
+    for article in articles:
+        fe = fg.add_entry()
+        fe.id(article.podcast_url)
+        fe.title(article.podcast_title)
+        fe.link(href=article.link)
+        fe.content(article.podcast_description, type="CDATA")
+        fe.enclosure(article.podcast_url, 0, "audio/mpeg")
+        fe.published(article.date)
+    return fg.rss_str()
+
+
+def timed(label: str, func, *args) -> bytes:
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{label:>28}: {(time.perf_counter() - start) * 1000:8.1f}ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=10_000)
+    args = parser.parse_args()
+
+    articles = [make_article(n) for n in range(1, args.episodes + 1)]
+    print(f"Rendering a feed with {len(articles)} episodes")
+
+    timed("feedgen full rebuild", full_rebuild, articles)
+    renderer = PodcastFeedRenderer()
+    timed("cached renderer, cold", renderer.render, articles)
+    timed("cached renderer, unchanged", renderer.render, articles)
+    articles.append(make_article(args.episodes + 1))
+    timed("cached renderer, +1 episode", renderer.render, articles)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env -S uv run python
+"""Compare serial vs length-bucketed batched TTS on Modal.
+
+Synthesizes the newest articles of the feed once per schedule, on the
+same warm container, and prints per-article synthesis time and the mean
+GPU utilization sampled inside the container.
+
+    uv run python scripts/benchmark_tts_batching.py --articles 3
+"""
+
+import argparse
+import time
+
+SCHEDULES = {
+    # The old behavior: one chunk per engine call, in document order
+    "serial": {"batch_size": 1},
+    "batched": {},
+}
+
+
+def main():
+    from podcaster.config import FEED_URL
+    from podcaster.modal_functions import TTSService
+    from podcaster.parser import get_articles, html_to_speech
+    from podcaster.transcription import (
+        default_generation_kwargs,
+        modal_session,
+        split_text_into_chunks,
+    )
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=3)
+    args = parser.parse_args()
+
+    articles = get_articles(FEED_URL, limit=args.articles)
+    texts = [html_to_speech(article.content) for article in articles]
+
+    with modal_session():
+        service = TTSService()
+        # Keep engine init out of the timings
+        list(service.synthesize.remote_gen(chunks=["Warming up."]))
+        init_seconds = service.stats.remote()["init_seconds"]
+        print(f"Engine init: {init_seconds:.1f}s")
+
+        for article, text in zip(articles, texts):
+            chunks = split_text_into_chunks(text)
+            print(f"{article.title[:50]!r}: {len(chunks)} chunks")
+            for name, overrides in SCHEDULES.items():
+                start = time.perf_counter()
+                audio = list(
+                    service.synthesize.remote_gen(
+                        chunks=chunks,
+                        generation_kwargs={
+                            **default_generation_kwargs(),
+                            **overrides,
+                        },
+                    )
+                )
+                elapsed = time.perf_counter() - start
+                stats = service.stats.remote()
+                gpu = stats["gpu_utilization"]
+                print(
+                    f"{name:>10}: {elapsed:6.1f}s, {stats['batches']} engine "
+                    f"calls, {'n/a' if gpu is None else f'{gpu:.0f}%'} GPU, "
+                    f"{sum(len(a) for a in audio) / 1e6:.1f} MB audio"
+                )
+
+
+if __name__ == "__main__":
+    main()
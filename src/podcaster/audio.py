@@ -0,0 +1,366 @@
+import functools
+import io
+import struct
+import subprocess
+import threading
+import typing as t
+from dataclasses import dataclass
+
+import numpy as np
+
+from podcaster.config import (
+    AUDIO_FFMPEG,
+    AUDIO_MP3_BITRATE,
+    AUDIO_PIPE_READ_SIZE,
+)
+
+_PCM = 1
+_IEEE_FLOAT = 3
+_EXTENSIBLE = 0xFFFE
+_HEADER_SIZE = 44
+# Data size for a stream whose length is not known when the header is sent
+_UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+@dataclass(frozen=True)
+class WavFormat:
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    is_float: bool = False
+
+    @property
+    def frame_size(self) -> int:
+        return self.channels * self.bits_per_sample // 8
+
+    @property
+    def dtype(self) -> np.dtype:
+        kind = "f" if self.is_float else "i"
+        if (kind, self.bits_per_sample) not in (
+            ("i", 16),
+            ("i", 32),
+            ("f", 32),
+            ("f", 64),
+        ):
+            raise ValueError(
+                f"Unsupported WAV sample format: {self.bits_per_sample}-bit "
+                f"{'float' if self.is_float else 'PCM'}"
+            )
+        return np.dtype(f"<{kind}{self.bits_per_sample // 8}")
+
+    def frames_for(self, ms: int) -> int:
+        return self.sample_rate * ms // 1000
+
+    def header(self, frames: int | None = None) -> bytes:
+        data_size = (
+            _UNKNOWN_SIZE - _HEADER_SIZE
+            if frames is None
+            else frames * self.frame_size
+        )
+        return b"".join(
+            (
+                b"RIFF",
+                struct.pack("<I", data_size + _HEADER_SIZE - 8),
+                b"WAVEfmt ",
+                struct.pack(
+                    "<IHHIIHH",
+                    16,
+                    _IEEE_FLOAT if self.is_float else _PCM,
+                    self.channels,
+                    self.sample_rate,
+                    self.sample_rate * self.frame_size,
+                    self.frame_size,
+                    self.bits_per_sample,
+                ),
+                b"data",
+                struct.pack("<I", data_size),
+            )
+        )
+
+
+def read_wav(data: bytes) -> t.Tuple[WavFormat, np.ndarray]:
+    """Return the format and a read-only ``(frames, channels)`` view of the
+    samples in a WAV file. The samples are not copied."""
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF/WAVE file")
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset : offset + 4]
+        (size,) = struct.unpack_from("<I", data, offset + 4)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            tag, channels, sample_rate, _, _, bits = struct.unpack_from(
+                "<HHIIHH", data, body
+            )
+            if tag == _EXTENSIBLE:
+                # The real format tag opens the sub-format GUID
+                (tag,) = struct.unpack_from("<H", data, body + 24)
+            if tag not in (_PCM, _IEEE_FLOAT):
+                raise ValueError(f"Unsupported WAV format tag: {tag:#x}")
+            fmt = WavFormat(channels, sample_rate, bits, tag == _IEEE_FLOAT)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk comes before its format")
+            # Streamed files may not know their size; trust the buffer then
+            size = min(size, len(data) - body)
+            frames = size // fmt.frame_size
+            samples = np.frombuffer(
+                data, dtype=fmt.dtype, count=frames * fmt.channels, offset=body
+            )
+            return fmt, samples.reshape(frames, fmt.channels)
+        offset = body + size + (size & 1)
+    raise ValueError("WAV file has no data chunk")
+
+
+@functools.lru_cache(maxsize=8)
+def _fade_curves(frames: int) -> t.Tuple[np.ndarray, np.ndarray]:
+    angles = np.linspace(0, np.pi / 2, frames, dtype=np.float32)[:, None]
+    return np.cos(angles), np.sin(angles)
+
+
+def _crossfade(outgoing: np.ndarray, incoming: np.ndarray) -> np.ndarray:
+    """Mix two equally long sample blocks with an equal-power crossfade."""
+    fade_out, fade_in = _fade_curves(len(outgoing))
+    mixed = outgoing * fade_out + incoming * fade_in
+    if outgoing.dtype.kind == "f":
+        return mixed.astype(outgoing.dtype)
+    info = np.iinfo(outgoing.dtype)
+    return np.clip(np.rint(mixed), info.min, info.max).astype(outgoing.dtype)
+
+
+def crossfaded_frames(lengths: t.Iterable[int], crossfade_frames: int) -> int:
+    """Number of frames ``CrossfadeWriter`` writes for chunks of ``lengths``."""
+    total = tail = 0
+    for frames in lengths:
+        overlap = min(tail, frames)
+        total += frames - overlap
+        tail = min(crossfade_frames, frames - overlap)
+    return total
+
+
+class CrossfadeWriter:
+    """Join WAV chunks with equal-power crossfades, writing as they come.
+
+    Everything but the last ``crossfade_ms`` of each chunk goes to ``sink``
+    as soon as the chunk is added; that tail is held back to be mixed into
+    the next chunk. Pass the total ``frames`` if known so the header is
+    right from the start, otherwise it is patched on close when ``sink``
+    is seekable and left as "unknown length" when it is not.
+    """
+
+    def __init__(
+        self,
+        sink: t.BinaryIO | io.RawIOBase,
+        crossfade_ms: int,
+        frames: int | None = None,
+    ):
+        self.sink = sink
+        self.crossfade_ms = crossfade_ms
+        self.frames = frames
+        self.format: WavFormat | None = None
+        self.written = 0
+        self._crossfade_frames = 0
+        self._tail: np.ndarray | None = None
+
+    def _write(self, samples: np.ndarray):
+        if not len(samples):
+            return
+        self.sink.write(np.ascontiguousarray(samples).data.cast("B"))
+        self.written += len(samples)
+
+    def add(self, chunk: bytes):
+        fmt, samples = read_wav(chunk)
+        if self.format is None:
+            self.format = fmt
+            self._crossfade_frames = fmt.frames_for(self.crossfade_ms)
+            self.sink.write(fmt.header(self.frames))
+        elif fmt != self.format:
+            raise ValueError(f"Chunk format {fmt} differs from {self.format}")
+
+        if self._tail is not None:
+            overlap = min(len(self._tail), len(samples))
+            split = len(self._tail) - overlap
+            self._write(self._tail[:split])
+            self._write(_crossfade(self._tail[split:], samples[:overlap]))
+            samples = samples[overlap:]
+
+        keep = min(self._crossfade_frames, len(samples))
+        self._write(samples[: len(samples) - keep])
+        self._tail = samples[len(samples) - keep :]
+
+    def close(self):
+        if self._tail is not None:
+            self._write(self._tail)
+            self._tail = None
+        if self.format is None or self.frames is not None:
+            return
+        if self.sink.seekable():
+            end = self.sink.tell()
+            self.sink.seek(
+                end - _HEADER_SIZE - self.written * self.format.frame_size
+            )
+            self.sink.write(self.format.header(self.written))
+            self.sink.seek(end)
+
+    def __enter__(self) -> "CrossfadeWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        # A failed stream is left as is rather than finished off
+        if exc_type is None:
+            self.close()
+
+
+class _BufferSink(io.RawIOBase):
+    """Minimal writable file over a preallocated buffer."""
+
+    def __init__(self, buffer: bytearray):
+        self.view = memoryview(buffer)
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        size = len(data)
+        self.view[self.position : self.position + size] = data
+        self.position += size
+        return size
+
+
+def concatenate_wav(chunks: t.List[bytes], crossfade_ms: int) -> bytearray:
+    """Join WAV chunks with equal-power crossfades into one WAV file.
+
+    The output size is worked out from the chunk headers first, so every
+    sample is copied exactly once into a single preallocated buffer.
+    """
+    decoded = [read_wav(chunk) for chunk in chunks]
+    fmt = decoded[0][0]
+    frames = crossfaded_frames(
+        (len(samples) for _, samples in decoded), fmt.frames_for(crossfade_ms)
+    )
+    buffer = bytearray(_HEADER_SIZE + frames * fmt.frame_size)
+    with CrossfadeWriter(
+        _BufferSink(buffer), crossfade_ms, frames=frames
+    ) as writer:
+        for chunk in chunks:
+            writer.add(chunk)
+    return buffer
+
+
+class Mp3Encoder(io.RawIOBase):
+    """Encode a WAV stream to MP3 with one long-lived ffmpeg process.
+
+    WAV bytes written here are piped into ffmpeg as they come, and a
+    background thread copies the MP3 frames it produces into ``sink``, so
+    encoding keeps pace with whatever produces the audio. The WAV header
+    may carry an unknown length, ffmpeg reads until the pipe closes.
+    ffmpeg's stderr is drained on another thread so it can never fill up
+    and stall the encoder.
+    """
+
+    def __init__(
+        self,
+        sink: t.BinaryIO | io.RawIOBase,
+        bitrate: str = AUDIO_MP3_BITRATE,
+        ffmpeg: str = AUDIO_FFMPEG,
+    ):
+        self.sink = sink
+        self.process = subprocess.Popen(
+            [
+                ffmpeg,
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-f",
+                "wav",
+                "-ignore_length",
+                "1",
+                "-i",
+                "pipe:0",
+                "-f",
+                "mp3",
+                "-b:a",
+                bitrate,
+                "pipe:1",
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self._error: BaseException | None = None
+        self._stderr = bytearray()
+        self._pump = threading.Thread(target=self._copy_output, daemon=True)
+        self._pump.start()
+        self._stderr_pump = threading.Thread(
+            target=self._copy_errors, daemon=True
+        )
+        self._stderr_pump.start()
+
+    def _copy_output(self):
+        assert self.process.stdout is not None
+        try:
+            while data := self.process.stdout.read(AUDIO_PIPE_READ_SIZE):
+                self.sink.write(data)
+        except BaseException as e:
+            self._error = e
+            # Unblocks the writer, which then gets a broken pipe
+            self.process.kill()
+
+    def _copy_errors(self):
+        assert self.process.stderr is not None
+        while data := self.process.stderr.read(AUDIO_PIPE_READ_SIZE):
+            # Only the end matters for the error message
+            self._stderr += data
+            del self._stderr[:-AUDIO_PIPE_READ_SIZE]
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        assert self.process.stdin is not None
+        try:
+            self.process.stdin.write(data)
+        except BrokenPipeError:
+            self.close()
+            raise
+        return len(data)
+
+    def _finish(self):
+        assert self.process.stdin is not None
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._pump.join()
+        self._stderr_pump.join()
+        returncode = self.process.wait()
+        stderr = self._stderr.decode(errors="replace").strip()
+        if self._error is not None:
+            raise self._error
+        if returncode:
+            raise RuntimeError(f"ffmpeg exited with {returncode}: {stderr}")
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._finish()
+        finally:
+            super().close()
+
+    def abort(self):
+        if self.closed:
+            return
+        self.process.kill()
+        self._pump.join()
+        self._stderr_pump.join()
+        self.process.wait()
+        super().close()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
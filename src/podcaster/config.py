@@ -10,6 +10,11 @@ ENV_MODAL_IMAGE_BUILDER_VERSION = "MODAL_IMAGE_BUILDER_VERSION"
 ENV_VLLM_WORKER_MULTIPROC_METHOD = "VLLM_WORKER_MULTIPROC_METHOD"
 ENV_HF_XET_HIGH_PERFORMANCE = "HF_XET_HIGH_PERFORMANCE"
 OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+FEED_FETCH_CONNECT_TIMEOUT_SECONDS = 5
+FEED_FETCH_READ_TIMEOUT_SECONDS = 30
+FEED_FETCH_USER_AGENT = (
+    "podcaster (+https://github.com/duarteocarmo/podcaster)"
+)
 
 # MODAL
 MODAL_GPU = "L40S"
@@ -22,24 +27,94 @@ MODAL_IMAGE_BUILDER_VERSION = "2025.06"
 VLLM_WORKER_MULTIPROC_METHOD = "spawn"
 HF_XET_HIGH_PERFORMANCE = "1"
 
+# PIPELINE
+PIPELINE_QUEUE_SIZE = 2
+PIPELINE_PREPROCESS_WORKERS = 8
+PIPELINE_TRANSCRIBE_WORKERS = MODAL_MAX_CONTAINERS
+# Preprocessed articles are small, so let the LLM stage run far ahead of TTS
+PIPELINE_TRANSCRIBE_QUEUE_SIZE = TRANSCRIBE_LAST_N_ARTICLES
+
+# AUDIO
+AUDIO_FFMPEG = "ffmpeg"
+AUDIO_MP3_BITRATE = "128k"
+AUDIO_PIPE_READ_SIZE = 64 * 1024
+# Keep the crossfaded WAV next to the MP3, e.g. for listening checks
+AUDIO_KEEP_WAV = False
+
 # QWEN TTS
 QWEN_TTS_MODEL = "duarteocarmo/qwen_tts_finetune_0.6B_e10_l1e6"
 QWEN_TTS_SPEAKER = "duarte"
 QWEN_TTS_LANGUAGE = "English"
 QWEN_TTS_MAX_CHARS_PER_CHUNK = 1000
-QWEN_TTS_BATCH_SIZE = 1
+# Chunks per engine call; a call also holds at most this much text, which
+# bounds its KV cache use on the GPU
+QWEN_TTS_BATCH_SIZE = 16
+QWEN_TTS_MAX_BATCH_CHARS = 16_000
 QWEN_TTS_MAX_NEW_TOKENS = 2048
 QWEN_TTS_CROSSFADE_MS = 50
 QWEN_TTS_MODAL_IMAGE = "vllm/vllm-omni:v0.21.0rc1"
 QWEN_TTS_VLLM_VERSION = "vllm==0.21.0"
 QWEN_TTS_TASK_TYPE = "CustomVoice"
 
+# STATE
+STATE_DIR = ".podcaster/"
+STATE_DB_PATH = f"{STATE_DIR}state.db"  # for the default bucket
+STATE_RECONCILE_INTERVAL_HOURS = 24
+STATE_SPILL_DIR = f"{STATE_DIR}articles/"  # article text moved out of memory
+
+# LLM
+LLM_PROMPT_VERSION = 3  # bump whenever the preprocessing prompt changes
+LLM_CACHE_DIR = f"{STATE_DIR}llm_cache/"
+LLM_CACHE_MAX_AGE_DAYS = 30
+LLM_CACHE_MAX_MB = 100
+LLM_MAX_ATTEMPTS = 3
+LLM_CODE_PREVIEW_LINES = 3  # lines of each code block kept in prompts
+# Articles at least this long are preprocessed section by section in parallel
+LLM_MAP_REDUCE_MIN_CHARS = 12_000
+LLM_SECTION_MAX_CHARS = 6_000
+# "llm": the LLM writes the transcript, "local": the transcript is rendered
+# from the HTML and the LLM only writes show notes, "hybrid": like "local"
+# but the LLM also supplies spoken forms for acronyms and dates.
+LLM_PREPROCESSING_MODE = "llm"
+LLM_PREPROCESSING_MODES = ("llm", "local", "hybrid")
+LLM_STREAMING = False  # start TTS while the transcript is still streaming
+LLM_MAX_CONCURRENT_REQUESTS = 8
+LLM_REQUESTS_PER_MINUTE = 20
+LLM_TOKENS_PER_MINUTE = 400_000
+LLM_CONNECT_TIMEOUT_SECONDS = 10
+LLM_READ_TIMEOUT_SECONDS = 600
+# Room for a hedged duplicate of every in-flight request
+LLM_MAX_CONNECTIONS = 2 * LLM_MAX_CONCURRENT_REQUESTS
+LLM_KEEPALIVE_EXPIRY_SECONDS = 90
+# Fire a duplicate request once the first is slower than this percentile of
+# the model's recorded latencies (or the default, until enough are recorded).
+# Off by default: every hedge is a second full request, so slow calls can
+# cost up to twice as much.
+LLM_HEDGE = False
+LLM_HEDGE_PERCENTILE = 0.9
+LLM_HEDGE_DEFAULT_AFTER_SECONDS = 120
+LLM_HEDGE_MIN_SAMPLES = 20
+LLM_HEDGE_MODEL: str | None = None  # None hedges with the same model
+LLM_LATENCY_PATH = f"{STATE_DIR}llm_latency.json"
+LLM_LATENCY_MAX_SAMPLES = 1000
+
 # STORAGE
+STORAGE_BACKEND = "s3"  # "s3" or "local"
+LOCAL_STORAGE_DIR = "public/"
+LOCAL_PUBLIC_URL = "http://localhost:8000"  # where LOCAL_STORAGE_DIR is served
 BUCKET_NAME = "podcaster"
 BUCKET_URL = (
     "https://cd7ef6e066027aea5df8b21d160a0431.r2.cloudflarestorage.com"
 )
 PUBLIC_BUCKET_URL = "https://r2.duarteocarmo.com"
+BUCKET_MANIFEST_KEY = f"{RESULTS_DIR}index.json"
+BUCKET_MANIFEST_MAX_ATTEMPTS = 5
+UPLOAD_MAX_WORKERS = 4
+UPLOAD_MAX_CONCURRENCY = 8
+UPLOAD_MAX_POOL_CONNECTIONS = 32
+UPLOAD_MULTIPART_THRESHOLD_MB = 8
+UPLOAD_MULTIPART_CHUNKSIZE_MB = 8
+DELETE_BATCH_SIZE = 1000
 
 # PODCAST
 NAME = "Duarte O.Carmo"
@@ -49,6 +124,11 @@ A podcast version of my personal website. All the episodes are generated from a
 """.strip()
 PODCAST_EXPLICIT = False
 PODCAST_FEED_NAME = "podcast.xml"
+PODCAST_FEED_CONTENT_TYPE = "application/rss+xml"
+PODCAST_FEED_PAGE_SIZE = 50
+PODCAST_FEED_ARCHIVE_DIR = "feed-archive/"
+PODCAST_FEED_CACHE_CONTROL = "public, max-age=300"
+PODCAST_FEED_ARCHIVE_CACHE_CONTROL = "public, max-age=31536000, immutable"
 PODCAST_IMAGE = f"{PUBLIC_BUCKET_URL}/cover.png"
 PODCAST_NAME = f"{NAME}'s articles"
 PODCAST_WEBSITE = WEBSITE
@@ -0,0 +1,78 @@
+import functools
+import hashlib
+from dataclasses import dataclass
+
+import requests
+from loguru import logger
+
+from podcaster.config import (
+    FEED_FETCH_CONNECT_TIMEOUT_SECONDS,
+    FEED_FETCH_READ_TIMEOUT_SECONDS,
+    FEED_FETCH_USER_AGENT,
+)
+
+
+@dataclass
+class FeedResponse:
+    content: bytes | None
+    etag: str | None
+    last_modified: str | None
+    body_hash: str | None
+    unchanged: bool
+
+
+@functools.lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update(
+        {
+            "User-Agent": FEED_FETCH_USER_AGENT,
+            "Accept-Encoding": "gzip, deflate",
+        }
+    )
+    return session
+
+
+def fetch_feed(
+    feed_url: str,
+    etag: str | None = None,
+    last_modified: str | None = None,
+    previous_hash: str | None = None,
+) -> FeedResponse:
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    response = get_session().get(
+        feed_url,
+        headers=headers,
+        timeout=(
+            FEED_FETCH_CONNECT_TIMEOUT_SECONDS,
+            FEED_FETCH_READ_TIMEOUT_SECONDS,
+        ),
+    )
+    if response.status_code == 304:
+        logger.info("Feed not modified since last fetch")
+        return FeedResponse(
+            content=None,
+            etag=etag,
+            last_modified=last_modified,
+            body_hash=previous_hash,
+            unchanged=True,
+        )
+    response.raise_for_status()
+
+    body_hash = hashlib.sha256(response.content).hexdigest()
+    unchanged = previous_hash is not None and body_hash == previous_hash
+    if unchanged:
+        logger.info("Feed body unchanged since last fetch")
+
+    return FeedResponse(
+        content=response.content,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        body_hash=body_hash,
+        unchanged=unchanged,
+    )
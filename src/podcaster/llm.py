@@ -0,0 +1,551 @@
+import asyncio
+import atexit
+import bisect
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+import typing as t
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+import httpx
+import openai
+from loguru import logger
+from openai import (
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
+    OpenAI,
+)
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletion, ChatCompletionMessageParam
+from tenacity import RetryCallState
+from tenacity.wait import wait_base
+
+from podcaster.config import (
+    ENV_OPENAI_API_KEY,
+    LLM_CONNECT_TIMEOUT_SECONDS,
+    LLM_HEDGE,
+    LLM_HEDGE_DEFAULT_AFTER_SECONDS,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_MODEL,
+    LLM_HEDGE_PERCENTILE,
+    LLM_KEEPALIVE_EXPIRY_SECONDS,
+    LLM_LATENCY_MAX_SAMPLES,
+    LLM_LATENCY_PATH,
+    LLM_MAX_CONNECTIONS,
+    LLM_READ_TIMEOUT_SECONDS,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    OPENROUTER_BASE_URL,
+)
+
+_T = t.TypeVar("_T")
+_shared_lock = threading.RLock()
+
+
+def _shared(factory: t.Callable[[], _T]) -> t.Callable[[], _T]:
+    """Like ``lru_cache(maxsize=1)``, but never builds two instances when
+    worker threads race on first use.
+    """
+    cached = functools.lru_cache(maxsize=1)(factory)
+
+    @functools.wraps(factory)
+    def get() -> _T:
+        with _shared_lock:
+            return cached()
+
+    return get
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Empty the bucket so that no one acquires for ``seconds``."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, tokens: int):
+        self.requests.acquire(1)
+        self.tokens.acquire(tokens)
+
+    def pause(self, seconds: float):
+        logger.warning(
+            f"Rate limited, pausing LLM requests for {seconds:.1f}s"
+        )
+        self.requests.pause(seconds)
+
+
+@_shared
+def get_rate_limiter() -> RateLimiter:
+    return RateLimiter(
+        requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+    )
+
+
+class LatencyHistogram:
+    """Per-model request latencies in log-spaced buckets, kept on disk.
+
+    Once a model has enough samples its percentile latency becomes the
+    hedge threshold. Counts are halved past ``max_samples`` so the
+    histogram follows recent behaviour. Samples are only written back by
+    ``save``, so recording one never touches the disk.
+    """
+
+    # 0.5s up to about 50 minutes, each bucket 25% wider than the last
+    BOUNDS = [0.5 * 1.25**i for i in range(40)]
+
+    def __init__(
+        self,
+        path: str = LLM_LATENCY_PATH,
+        max_samples: int = LLM_LATENCY_MAX_SAMPLES,
+    ):
+        self.path = Path(path)
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.dirty = False
+        try:
+            self.counts: t.Dict[str, t.List[int]] = json.loads(
+                self.path.read_text()
+            )
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.counts = {}
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self.path.parent, prefix=".tmp-"
+            )
+            with os.fdopen(fd, "w") as tmp:
+                json.dump(self.counts, tmp)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+    def record(self, model: str, seconds: float):
+        with self.lock:
+            counts = self.counts.get(model)
+            if counts is None or len(counts) != len(self.BOUNDS) + 1:
+                counts = self.counts[model] = [0] * (len(self.BOUNDS) + 1)
+            counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+            if sum(counts) > self.max_samples:
+                counts[:] = [count // 2 for count in counts]
+            self.dirty = True
+
+    def percentile(self, model: str, q: float) -> float | None:
+        """Upper bound of the bucket holding the ``q`` quantile, if known."""
+        with self.lock:
+            counts = list(self.counts.get(model, []))
+        total = sum(counts)
+        if total < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        running = 0
+        for index, count in enumerate(counts):
+            running += count
+            if running >= q * total:
+                return self.BOUNDS[min(index, len(self.BOUNDS) - 1)]
+        return self.BOUNDS[-1]
+
+    def hedge_after(self, model: str) -> float:
+        threshold = self.percentile(model, LLM_HEDGE_PERCENTILE)
+        if threshold is None:
+            return LLM_HEDGE_DEFAULT_AFTER_SECONDS
+        return threshold
+
+
+@_shared
+def get_latency_histogram() -> LatencyHistogram:
+    histogram = LatencyHistogram()
+    atexit.register(histogram.save)
+    return histogram
+
+
+@dataclass
+class ModelUsage:
+    requests: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    latency_seconds: float = 0.0
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        if not self.prompt_tokens:
+            return 0.0
+        return self.cached_tokens / self.prompt_tokens
+
+
+class UsageTracker:
+    """Token usage and latency of this run's completions, per model."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.models: t.Dict[str, ModelUsage] = {}
+
+    def record(
+        self, model: str, usage: CompletionUsage | None, latency: float
+    ):
+        prompt_tokens = usage.prompt_tokens if usage else 0
+        completion_tokens = usage.completion_tokens if usage else 0
+        details = usage.prompt_tokens_details if usage else None
+        cached_tokens = (details.cached_tokens or 0) if details else 0
+        logger.debug(
+            f"{model}: {prompt_tokens} prompt tokens ({cached_tokens} "
+            f"cached), {completion_tokens} completion tokens in {latency:.1f}s"
+        )
+        with self.lock:
+            totals = self.models.setdefault(model, ModelUsage())
+            totals.requests += 1
+            totals.prompt_tokens += prompt_tokens
+            totals.cached_tokens += cached_tokens
+            totals.completion_tokens += completion_tokens
+            totals.latency_seconds += latency
+
+    def report(self):
+        with self.lock:
+            models = dict(self.models)
+        for model, usage in sorted(models.items()):
+            logger.info(
+                f"LLM usage for {model}: {usage.requests} requests, "
+                f"{usage.prompt_tokens} prompt tokens "
+                f"({usage.cache_hit_ratio:.0%} cache hits), "
+                f"{usage.completion_tokens} completion tokens, "
+                f"{usage.latency_seconds / usage.requests:.1f}s mean latency"
+            )
+
+
+@_shared
+def get_usage_tracker() -> UsageTracker:
+    return UsageTracker()
+
+
+def _with_usage(extra_body: t.Dict[str, t.Any] | None) -> t.Dict[str, t.Any]:
+    # OpenRouter only reports cached tokens when usage accounting is on
+    return {"usage": {"include": True}, **(extra_body or {})}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def retry_after_seconds(exc: BaseException | None) -> float | None:
+    if not isinstance(exc, openai.APIStatusError) or exc.status_code != 429:
+        return None
+
+    headers = exc.response.headers
+    if retry_after_ms := headers.get("retry-after-ms"):
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class wait_retry_after(wait_base):
+    """Wait as long as a 429's Retry-After asks, else defer to ``fallback``."""
+
+    def __init__(self, fallback: wait_base):
+        self.fallback = fallback
+
+    def __call__(self, retry_state: RetryCallState) -> float:
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        retry_after = retry_after_seconds(exc)
+        if retry_after is not None:
+            return retry_after
+        return self.fallback(retry_state)
+
+
+class ConnectionStats:
+    """Time spent opening LLM connections, from httpx connection traces.
+
+    Requests on a warm keep-alive connection skip TCP and TLS setup
+    entirely, so ``connections`` well below ``requests`` means reuse.
+    """
+
+    _SETUP_STEPS = ("connection.connect_tcp", "connection.start_tls")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.setup_seconds = 0.0
+
+    def _on_event(self, starts: t.Dict[str, float], event_name: str):
+        step, _, phase = event_name.rpartition(".")
+        if step not in self._SETUP_STEPS:
+            return
+        if phase == "started":
+            starts[step] = time.perf_counter()
+        elif phase == "complete" and step in starts:
+            elapsed = time.perf_counter() - starts.pop(step)
+            logger.debug(f"LLM {step} took {elapsed * 1000:.0f}ms")
+            with self.lock:
+                self.setup_seconds += elapsed
+                if step == "connection.connect_tcp":
+                    self.connections += 1
+
+    def on_request(self, request: httpx.Request):
+        starts: t.Dict[str, float] = {}
+
+        def trace(event_name: str, info: t.Dict[str, t.Any]):
+            self._on_event(starts, event_name)
+
+        request.extensions["trace"] = trace
+        with self.lock:
+            self.requests += 1
+
+    async def on_async_request(self, request: httpx.Request):
+        starts: t.Dict[str, float] = {}
+
+        async def trace(event_name: str, info: t.Dict[str, t.Any]):
+            self._on_event(starts, event_name)
+
+        request.extensions["trace"] = trace
+        with self.lock:
+            self.requests += 1
+
+    def report(self):
+        if not self.requests:
+            return
+        mean_ms = self.setup_seconds / max(self.connections, 1) * 1000
+        logger.info(
+            f"LLM connections: {self.connections} opened for "
+            f"{self.requests} requests, {self.setup_seconds:.2f}s spent "
+            f"in setup ({mean_ms:.0f}ms each)"
+        )
+
+
+@_shared
+def get_connection_stats() -> ConnectionStats:
+    return ConnectionStats()
+
+
+def _http_options() -> t.Dict[str, t.Any]:
+    return {
+        "timeout": httpx.Timeout(
+            LLM_READ_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS
+        ),
+        "limits": httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    }
+
+
+@_shared
+def get_client() -> OpenAI:
+    """The shared client; its connection pool is reused by every thread."""
+    return OpenAI(
+        base_url=OPENROUTER_BASE_URL,
+        api_key=os.environ[ENV_OPENAI_API_KEY],
+        max_retries=0,
+        http_client=DefaultHttpxClient(
+            event_hooks={"request": [get_connection_stats().on_request]},
+            **_http_options(),
+        ),
+    )
+
+
+@_shared
+def get_async_client() -> AsyncOpenAI:
+    """The shared async client, only to be used on ``_event_loop()``."""
+    return AsyncOpenAI(
+        base_url=OPENROUTER_BASE_URL,
+        api_key=os.environ[ENV_OPENAI_API_KEY],
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(
+            event_hooks={"request": [get_connection_stats().on_async_request]},
+            **_http_options(),
+        ),
+    )
+
+
+def report_usage():
+    get_usage_tracker().report()
+    get_connection_stats().report()
+
+
+def _acquire(messages: t.List[ChatCompletionMessageParam]) -> RateLimiter:
+    limiter = get_rate_limiter()
+    prompt_tokens = sum(
+        estimate_tokens(str(message.get("content", "")))
+        for message in messages
+    )
+    # Transcripts are about as long as the article, so reserve for both.
+    limiter.acquire(tokens=prompt_tokens * 2)
+    return limiter
+
+
+@_shared
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """A background loop shared by all threads, so requests can be cancelled."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(
+        target=loop.run_forever, name="llm-event-loop", daemon=True
+    ).start()
+    return loop
+
+
+async def _hedged_create(
+    model: str,
+    messages: t.List[ChatCompletionMessageParam],
+    temperature: float,
+    extra_body: t.Dict[str, t.Any],
+    hedge_after: float | None,
+    hedge_model: str,
+) -> ChatCompletion:
+    """Send the request and, if it takes longer than ``hedge_after``, a
+    duplicate to ``hedge_model``. The first success wins, the other is
+    cancelled.
+    """
+    histogram = get_latency_histogram()
+    client = get_async_client()
+
+    async def attempt(attempt_model: str) -> ChatCompletion:
+        start = time.monotonic()
+        try:
+            completion = await client.chat.completions.create(
+                model=attempt_model,
+                messages=messages,
+                temperature=temperature,
+                extra_body=extra_body,
+            )
+        except asyncio.CancelledError:
+            # Only a lower bound, but it keeps slow requests in the tail
+            histogram.record(attempt_model, time.monotonic() - start)
+            raise
+        except openai.RateLimitError as e:
+            get_rate_limiter().pause(retry_after_seconds(e) or 10.0)
+            raise
+        latency = time.monotonic() - start
+        histogram.record(attempt_model, latency)
+        get_usage_tracker().record(attempt_model, completion.usage, latency)
+        return completion
+
+    pending = {asyncio.create_task(attempt(model))}
+    done, _ = await asyncio.wait(pending, timeout=hedge_after)
+    if not done:
+        logger.warning(
+            f"No response from {model} after {hedge_after:.1f}s, "
+            f"hedging with {hedge_model}"
+        )
+        await asyncio.to_thread(_acquire, messages)
+        pending.add(asyncio.create_task(attempt(hedge_model)))
+
+    errors = []
+    while pending:
+        done, pending = await asyncio.wait(
+            pending, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in done:
+            if (error := task.exception()) is not None:
+                errors.append(error)
+                continue
+            for other in pending:
+                other.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            return task.result()
+    raise errors[0]
+
+
+def complete(
+    model: str,
+    messages: t.List[ChatCompletionMessageParam],
+    temperature: float,
+    extra_body: t.Dict[str, t.Any] | None = None,
+    hedge: bool = LLM_HEDGE,
+) -> ChatCompletion:
+    _acquire(messages)
+    hedge_after = get_latency_histogram().hedge_after(model) if hedge else None
+    future = asyncio.run_coroutine_threadsafe(
+        _hedged_create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            extra_body=_with_usage(extra_body),
+            hedge_after=hedge_after,
+            hedge_model=LLM_HEDGE_MODEL or model,
+        ),
+        _event_loop(),
+    )
+    return future.result()
+
+
+def stream_complete(
+    model: str,
+    messages: t.List[ChatCompletionMessageParam],
+    temperature: float,
+    extra_body: t.Dict[str, t.Any] | None = None,
+) -> t.Iterator[str]:
+    limiter = _acquire(messages)
+    start = time.monotonic()
+    try:
+        stream = get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            extra_body=_with_usage(extra_body),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+    except openai.RateLimitError as e:
+        limiter.pause(retry_after_seconds(e) or 10.0)
+        raise
+    usage = None
+    with stream:
+        for chunk in stream:
+            usage = chunk.usage or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    get_usage_tracker().record(model, usage, time.monotonic() - start)
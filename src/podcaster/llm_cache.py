@@ -0,0 +1,87 @@
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import time
+import typing as t
+from pathlib import Path
+
+from loguru import logger
+
+from podcaster.config import (
+    LLM_CACHE_DIR,
+    LLM_CACHE_MAX_AGE_DAYS,
+    LLM_CACHE_MAX_MB,
+)
+
+
+def cache_key(*parts: t.Any) -> str:
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+class LLMCache:
+    """Content-addressed store for LLM preprocessing results on disk.
+
+    One JSON file per key. Hits refresh the file's mtime, so size-based
+    eviction drops the least recently used entries first.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = LLM_CACHE_DIR,
+        max_age_days: float = LLM_CACHE_MAX_AGE_DAYS,
+        max_mb: float = LLM_CACHE_MAX_MB,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> t.Dict[str, str] | None:
+        path = self._path_for(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            value = json.loads(path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        os.utime(path)
+        return value
+
+    def set(self, key: str, value: t.Dict[str, str]):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+        with os.fdopen(fd, "w") as tmp:
+            json.dump(value, tmp)
+        os.replace(tmp_path, self._path_for(key))
+        self.evict()
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            logger.debug(f"Evicted {path.name} from LLM cache")
+
+
+@functools.lru_cache(maxsize=1)
+def get_llm_cache() -> LLMCache:
+    return LLMCache()
@@ -1,76 +1,327 @@
 import argparse
 import os
+import typing as t
+from datetime import timedelta
 
 import requests
 from loguru import logger
 
 from podcaster.config import (
+    AUDIO_KEEP_WAV,
     BUCKET_NAME,
     ENV_REBUILD_TRIGGER_URL,
     FEED_URL,
+    LLM_PREPROCESSING_MODE,
     LLM_PREPROCESSING_MODEL,
+    LLM_PREPROCESSING_MODES,
+    LLM_STREAMING,
+    PIPELINE_PREPROCESS_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_TRANSCRIBE_QUEUE_SIZE,
+    PIPELINE_TRANSCRIBE_WORKERS,
+    PODCAST_FEED_CONTENT_TYPE,
+    RESULTS_DIR,
+    STATE_RECONCILE_INTERVAL_HOURS,
+    STORAGE_BACKEND,
     TRANSCRIBE_LAST_N_ARTICLES,
 )
-from podcaster.parser import generate_podcast_feed_from, get_articles
-from podcaster.storage import S3BucketManager
-from podcaster.transcription import transcribe_to_file
+from podcaster.fetch import fetch_feed
+from podcaster.llm import report_usage
+from podcaster.parser import (
+    ParsedArticle,
+    get_articles,
+    llm_stream_retry,
+    parse_articles,
+    preprocess_articles,
+)
+from podcaster.pipeline import Stage, StageFailure, run_pipeline
+from podcaster.podcast_feed import PodcastFeedRenderer
+from podcaster.state import (
+    STATUS_FAILED,
+    STATUS_PUBLISHED,
+    StateStore,
+    state_db_path_for,
+)
+from podcaster.storage import BytesUpload, get_storage
+from podcaster.transcription import (
+    modal_session,
+    synthesize_article,
+    synthesize_stream,
+    transcribe_stream_to_file,
+    transcribe_to_file,
+    upload_transcription,
+)
 
 
 class Podcaster:
-    def __init__(self, feed_url: str, bucket_name: str):
+    def __init__(
+        self,
+        feed_url: str,
+        bucket_name: str,
+        state_db_path: str | None = None,
+        storage_backend: str = STORAGE_BACKEND,
+        use_llm_cache: bool = True,
+        stream_llm: bool = LLM_STREAMING,
+        preprocessing_mode: str = LLM_PREPROCESSING_MODE,
+        keep_wav: bool = AUDIO_KEEP_WAV,
+    ):
         self.feed_url = feed_url
         self.bucket_name = bucket_name
-        self.s3 = S3BucketManager(bucket_name=self.bucket_name)
+        self.storage = get_storage(
+            backend=storage_backend, bucket_name=self.bucket_name
+        )
+        self.state = StateStore(
+            db_path=state_db_path
+            or state_db_path_for(storage_backend, self.bucket_name)
+        )
+        self.feed_renderer = PodcastFeedRenderer(
+            base_url=self.storage.public_url
+        )
+        self.use_llm_cache = use_llm_cache
+        self.stream_llm = stream_llm
+        self.preprocessing_mode = preprocessing_mode
+        self.keep_wav = keep_wav
         self.transcribe_last = TRANSCRIBE_LAST_N_ARTICLES
         self.trigger_website_rebuild = False
 
-    def scan(self):
-        all_articles = get_articles(self.feed_url)[-self.transcribe_last :]
+    def reconcile(self, repair_manifest: bool = False, force: bool = False):
+        logger.info("Reconciling local state with storage")
+        if repair_manifest:
+            manifest = self.storage.reconcile_manifest()
+        else:
+            manifest = self.storage.get_manifest()
+        self.state.reconcile(manifest.transcribed_keys(), force=force)
+
+    def scan(self, reconcile: bool = False, force: bool = False):
+        repair_manifest = reconcile
+        reconcile = reconcile or self.state.needs_reconcile(
+            timedelta(hours=STATE_RECONCILE_INTERVAL_HOURS)
+        )
+        conditional = not (reconcile or force)
+        feed = fetch_feed(
+            self.feed_url,
+            **(self.state.get_feed_validators() if conditional else {}),
+        )
+        if feed.unchanged and conditional:
+            logger.info("Feed unchanged, nothing to do")
+            return
+
+        assert feed.content is not None
+        all_articles = parse_articles(feed.content, limit=self.transcribe_last)
         logger.info(f"Found {len(all_articles)} articles")
 
-        articles_to_transcribe = self.s3.get_untranscribed(
+        if reconcile:
+            self.reconcile(repair_manifest=repair_manifest, force=force)
+
+        articles_to_transcribe = self.state.get_unpublished(
             articles=all_articles
         )
-        for article in articles_to_transcribe:
-            all_articles.remove(article)
+        unpublished_ids = {article.id for article in articles_to_transcribe}
+        # Published articles, in feed order, keyed by id
+        published = {
+            article.id: article
+            for article in all_articles
+            if article.id not in unpublished_ids
+        }
+        for article in published.values():
+            article.drop_text()
         articles_to_transcribe = sorted(
             articles_to_transcribe, key=lambda x: x.date
         )
 
         if len(articles_to_transcribe) < 1:
             logger.info("No new articles to transcribe")
+            self.state.save_feed_validators(feed)
             return
 
         logger.info(
             f"Found {len(articles_to_transcribe)} articles to transcribe"
         )
 
-        for article in articles_to_transcribe:
-            assert article not in all_articles
-            article.preprocess_with_llm(LLM_PREPROCESSING_MODEL)
-            mp3_file_name = transcribe_to_file(
-                article=article,
-            )
-            self.s3.upload_files(files=[(mp3_file_name, mp3_file_name)])
-            logger.info(f"Uploaded file to S3: {mp3_file_name}")
-            all_articles.append(article)
-            feed_file = generate_podcast_feed_from(articles=all_articles)
-            self.s3.upload_files(files=[(feed_file, feed_file)])
-            logger.info("Updated podcast feed in S3")
+        if self.stream_llm:
+            stages = [
+                Stage(
+                    "stream",
+                    self._stream_transcribe,
+                    workers=PIPELINE_TRANSCRIBE_WORKERS,
+                ),
+            ]
+        else:
+            stages = [
+                Stage(
+                    "preprocess",
+                    self._preprocess,
+                    workers=PIPELINE_PREPROCESS_WORKERS,
+                ),
+                Stage(
+                    "transcribe",
+                    self._transcribe,
+                    workers=PIPELINE_TRANSCRIBE_WORKERS,
+                    queue_size=PIPELINE_TRANSCRIBE_QUEUE_SIZE,
+                ),
+            ]
+        failed = []
+        with modal_session():
+            for article, result in run_pipeline(
+                articles_to_transcribe,
+                stages,
+                queue_size=PIPELINE_QUEUE_SIZE,
+            ):
+                if isinstance(result, StageFailure):
+                    logger.error(
+                        f"Skipping '{article.title}': {result.stage} "
+                        f"failed with {result.error!r}"
+                    )
+                    failed.append(article)
+                    self.state.mark(article, STATUS_FAILED)
+                    continue
+
+                assert article.id not in published
+                published[article.id] = article
+                self._publish_feed(list(published.values()))
+                self.state.mark(article, STATUS_PUBLISHED, object_key=result)
+                article.drop_text()
+                self.trigger_website_rebuild = True
+
+        if not failed:
+            self.state.save_feed_validators(feed)
+            return
+
+        raise RuntimeError(
+            f"Failed to publish {len(failed)} articles: "
+            f"{[a.title for a in failed]}"
+        )
 
-        self.trigger_website_rebuild = True
+    def _publish_feed(self, articles: t.List[ParsedArticle]):
+        pages = []
+        uploads = []
+        for document in self.feed_renderer.render_paged(
+            articles, catalog=self.state
+        ):
+            for key, body, encoding in document.variants():
+                pages.append(document.page)
+                uploads.append(
+                    BytesUpload(
+                        data=body,
+                        key=key,
+                        content_type=PODCAST_FEED_CONTENT_TYPE,
+                        cache_control=document.cache_control,
+                        content_encoding=encoding,
+                    )
+                )
+        # One manifest update for every document and variant
+        results = self.storage.upload_many_bytes(uploads)
+        failed_pages = {
+            page for page, result in zip(pages, results) if not result.ok
+        }
+        # Failed archive pages are retried with the next feed update
+        for page in dict.fromkeys(pages):
+            if page is not None and page not in failed_pages:
+                self.state.mark_feed_page_uploaded(page)
+        logger.info("Updated podcast feed in storage")
+
+    def _preprocess(self, article: ParsedArticle) -> ParsedArticle:
+        article.preprocess_with_llm(
+            LLM_PREPROCESSING_MODEL,
+            use_cache=self.use_llm_cache,
+            mode=self.preprocessing_mode,
+        )
+        return article
+
+    def _transcribe(self, article: ParsedArticle) -> str:
+        return upload_transcription(
+            article,
+            synthesize_article(article),
+            self.storage,
+            keep_wav=self.keep_wav,
+        )
+
+    @llm_stream_retry
+    def _stream_transcribe(self, article: ParsedArticle) -> str:
+        return upload_transcription(
+            article,
+            synthesize_stream(
+                article.stream_preprocess_with_llm(
+                    LLM_PREPROCESSING_MODEL,
+                    use_cache=self.use_llm_cache,
+                    mode=self.preprocessing_mode,
+                )
+            ),
+            self.storage,
+            keep_wav=self.keep_wav,
+        )
+
+    def preprocess_only(self):
+        articles = get_articles(self.feed_url, limit=self.transcribe_last)
+        articles = self.state.get_unpublished(articles=articles)
+        logger.info(f"Preprocessing {len(articles)} unpublished articles")
+        failed = preprocess_articles(
+            articles,
+            LLM_PREPROCESSING_MODEL,
+            use_cache=self.use_llm_cache,
+            mode=self.preprocessing_mode,
+        )
+        if failed:
+            raise RuntimeError(
+                f"Failed to preprocess {len(failed)} articles: "
+                f"{[a.title for a in failed]}"
+            )
 
     def dry_run(self):
-        articles = get_articles(self.feed_url)
+        articles = get_articles(self.feed_url, limit=1)
         if not articles:
             raise ValueError("No articles found")
 
         article = articles[-1]
         logger.info(f"Dry run: transcribing latest article '{article.title}'")
-        article.preprocess_with_llm(LLM_PREPROCESSING_MODEL)
-        wav_file_name = transcribe_to_file(article=article, as_mp3=False)
+        if self.stream_llm:
+            wav_file_name = transcribe_stream_to_file(
+                article=article,
+                model=LLM_PREPROCESSING_MODEL,
+                use_cache=self.use_llm_cache,
+                mode=self.preprocessing_mode,
+                as_mp3=False,
+            )
+        else:
+            self._preprocess(article)
+            wav_file_name = transcribe_to_file(article=article, as_mp3=False)
         logger.info(f"Dry run audio saved to {wav_file_name}")
 
+    def gc(self, apply: bool = False):
+        articles = get_articles(self.feed_url)
+        if not articles:
+            raise ValueError("No articles found, refusing to collect garbage")
+
+        # Published feeds and archive pages still link to every catalogued
+        # episode, even once its article has left the blog feed
+        keep_ids = (
+            {article.id for article in articles}
+            | self.state.feed_item_ids()
+            | self.state.published_ids()
+        )
+        keep_keys = {
+            f"{RESULTS_DIR}{article_id}.mp3" for article_id in keep_ids
+        }
+        plan = self.storage.plan_garbage_collection(keep_keys=keep_keys)
+        if plan.is_empty:
+            logger.info("Nothing to collect")
+            return
+
+        for key in plan.orphans:
+            print(f"delete {key}")
+        for key in plan.dangling:
+            print(f"drop manifest entry {key}")
+        logger.info(
+            f"Plan: delete {len(plan.orphans)} objects "
+            f"({plan.orphan_bytes / 1e6:.1f} MB), drop "
+            f"{len(plan.dangling)} manifest entries"
+        )
+        if not apply:
+            logger.info("Dry run, pass --yes to apply")
+            return
+
+        self.storage.collect_garbage(plan)
+
     def rebuild(self):
         rebuild_trigger_url = os.getenv(ENV_REBUILD_TRIGGER_URL, None)
 
@@ -95,15 +346,92 @@ def main():
         action="store_true",
         help="Transcribe the latest article to a local WAV without publishing",
     )
+    parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="Rebuild the bucket manifest and local state from a full listing",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Scan the feed even if it has not changed since the last run, "
+        "and let --reconcile unpublish everything if storage lists nothing",
+    )
+    parser.add_argument(
+        "--gc",
+        action="store_true",
+        help="Plan deletion of bucket objects not backed by the feed or any "
+        "published episode",
+    )
+    parser.add_argument(
+        "--yes",
+        action="store_true",
+        help="Apply the --gc plan instead of only printing it",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=["s3", "local"],
+        default=STORAGE_BACKEND,
+        help="Where to publish episodes and the feed",
+    )
+    parser.add_argument(
+        "--no-llm-cache",
+        action="store_true",
+        help="Ignore cached LLM preprocessing results",
+    )
+    parser.add_argument(
+        "--preprocess-only",
+        action="store_true",
+        help="Preprocess unpublished articles concurrently into the LLM cache",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=LLM_STREAMING,
+        help="Start TTS while the LLM is still writing the transcript",
+    )
+    parser.add_argument(
+        "--preprocessing",
+        choices=LLM_PREPROCESSING_MODES,
+        default=LLM_PREPROCESSING_MODE,
+        help="Who writes the transcript: the LLM, or the local HTML renderer",
+    )
+    parser.add_argument(
+        "--keep-wav",
+        action="store_true",
+        default=AUDIO_KEEP_WAV,
+        help="Also keep the uncompressed WAV of each episode locally",
+    )
     args = parser.parse_args()
 
-    p = Podcaster(feed_url=FEED_URL, bucket_name=BUCKET_NAME)
-    if args.dry_run:
-        p.dry_run()
-        return
+    p = Podcaster(
+        feed_url=FEED_URL,
+        bucket_name=BUCKET_NAME,
+        storage_backend=args.storage,
+        use_llm_cache=not args.no_llm_cache,
+        stream_llm=args.stream,
+        preprocessing_mode=args.preprocessing,
+        keep_wav=args.keep_wav,
+    )
+    try:
+        if args.dry_run:
+            p.dry_run()
+            return
+
+        if args.preprocess_only:
+            p.preprocess_only()
+            return
+
+        if args.gc:
+            p.gc(apply=args.yes)
+            return
 
-    p.scan()
-    p.rebuild()
+        try:
+            p.scan(reconcile=args.reconcile, force=args.force)
+        finally:
+            p.rebuild()
+    finally:
+        report_usage()
 
 
 if __name__ == "__main__":
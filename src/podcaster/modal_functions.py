@@ -1,6 +1,9 @@
 import io
 import os
-from typing import Any
+import subprocess
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
 
 import modal
 
@@ -15,6 +18,7 @@ from podcaster.config import (
     MODAL_MAX_CONTAINERS,
     QWEN_TTS_BATCH_SIZE,
     QWEN_TTS_LANGUAGE,
+    QWEN_TTS_MAX_BATCH_CHARS,
     QWEN_TTS_MAX_NEW_TOKENS,
     QWEN_TTS_MODAL_IMAGE,
     QWEN_TTS_MODEL,
@@ -161,14 +165,78 @@ def _audio_bytes_from_multimodal_output(
     return output.getvalue()
 
 
-def _request_index_from(request_id: str):
+def _request_index_from(request_id: str) -> int | None:
+    # Omni.generate can't be given request ids: it names the requests of one
+    # call f"{i}_{uuid4()}" after their position in the prompt list (checked
+    # in vllm-omni 0.21.0rc1 and 0.30.0). Outputs don't carry our prompt
+    # either, it is all placeholder token ids, so that position is the only
+    # explicit id there is. Anything else fails loudly in ``_generate``.
     prefix = request_id.split("_", 1)[0]
     if prefix.isdigit():
         return int(prefix)
     return None
 
 
-@app.function(
+def plan_batches(
+    lengths: list[int], max_batch_size: int, max_batch_chars: int
+) -> list[list[int]]:
+    """Group request indexes into engine calls of similar text length.
+
+    Requests are bucketed longest first, so the requests of one call finish
+    close together instead of a few long ones straggling behind an idle
+    batch. A call holds at most ``max_batch_size`` requests and
+    ``max_batch_chars`` characters of text, a proxy for its KV cache use.
+    Calls are ordered by their earliest request, so audio can be handed
+    back in document order as early as possible.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    batches: list[list[int]] = []
+    batch: list[int] = []
+    chars = 0
+    for index in order:
+        if batch and (
+            len(batch) == max_batch_size
+            or chars + lengths[index] > max_batch_chars
+        ):
+            batches.append(batch)
+            batch, chars = [], 0
+        batch.append(index)
+        chars += lengths[index]
+    if batch:
+        batches.append(batch)
+    return sorted(batches, key=min)
+
+
+@contextmanager
+def _gpu_utilization(samples: list[float]):
+    """Sample GPU utilization in percent into ``samples`` while inside."""
+    try:
+        process = subprocess.Popen(
+            [
+                "nvidia-smi",
+                "--query-gpu=utilization.gpu",
+                "--format=csv,noheader,nounits",
+                "-lms",
+                "1000",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+    except FileNotFoundError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        process.terminate()
+        output, _ = process.communicate()
+        samples.extend(
+            float(line) for line in output.split() if line.isdigit()
+        )
+
+
+@app.cls(
     gpu=MODAL_GPU,
     max_containers=MODAL_MAX_CONTAINERS,
     timeout=20 * 60,
@@ -178,77 +246,167 @@ def _request_index_from(request_id: str):
         "/root/.cache/vllm": vllm_cache,
     },
 )
-def transcribe_chunks(
-    chunks: list[str],
-    generation_kwargs=None,
-) -> list[bytes]:
-    from vllm_omni import Omni
-
-    if not chunks:
-        return []
-
-    generation_kwargs = generation_kwargs or {}
-    speaker = generation_kwargs.get("speaker", QWEN_TTS_SPEAKER)
-    language = generation_kwargs.get("language", QWEN_TTS_LANGUAGE)
-    instructions = generation_kwargs.get("instructions", "")
-    max_new_tokens = generation_kwargs.get(
-        "max_new_tokens",
-        QWEN_TTS_MAX_NEW_TOKENS,
-    )
-    batch_size = generation_kwargs.get("batch_size", QWEN_TTS_BATCH_SIZE)
+class TTSService:
+    """Qwen TTS on a vLLM-Omni engine that lives as long as the container.
 
-    omni = Omni(
-        model=QWEN_TTS_MODEL,
-        log_stats=True,
-        stage_init_timeout=600,
-        trust_remote_code=True,
-    )
-    audio_results = []
-    try:
-        requests = [
-            _build_custom_voice_request(
-                text=chunk,
-                speaker=speaker,
-                language=language,
-                instructions=instructions,
-                max_new_tokens=max_new_tokens,
-            )
-            for chunk in chunks
-        ]
-        for batch_start in range(0, len(requests), batch_size):
-            batch = requests[batch_start : batch_start + batch_size]
-            batch_audio = [None] * len(batch)
-            fallback_index = 0
-            for stage_outputs in omni.generate(batch):
-                request_output = stage_outputs.request_output
-                if request_output is None or not request_output.outputs:
-                    continue
-
-                multimodal_output = request_output.outputs[0].multimodal_output
-                if not multimodal_output or "audio" not in multimodal_output:
-                    continue
-
-                request_index = _request_index_from(request_output.request_id)
-                if request_index is None or request_index >= len(batch):
-                    request_index = fallback_index
-                batch_audio[request_index] = (
-                    _audio_bytes_from_multimodal_output(multimodal_output)
-                )
-                fallback_index += 1
+    The engine is loaded once when the container starts, so every call
+    landing on a warm container, within ``scaledown_window`` of the last
+    one, goes straight to generation.
+    """
 
-            missing = [
-                i for i, audio in enumerate(batch_audio) if audio is None
-            ]
-            if missing:
+    @modal.enter()
+    def load(self):
+        self.last_call: dict[str, Any] = {}
+        self._start_engine()
+
+    def _start_engine(self):
+        from vllm_omni import Omni
+
+        start = time.perf_counter()
+        self.omni = Omni(
+            model=QWEN_TTS_MODEL,
+            log_stats=True,
+            stage_init_timeout=600,
+            trust_remote_code=True,
+        )
+        _prompt_len_resources_for(QWEN_TTS_MODEL)
+        self.init_seconds = time.perf_counter() - start
+        self.calls = 0
+        print(f"TTS engine initialized in {self.init_seconds:.1f}s")
+
+    @modal.exit()
+    def unload(self):
+        close = getattr(self.omni, "close", None)
+        if close is not None:
+            close()
+
+    def _generate(self, requests: list[dict[str, Any]]) -> list[bytes]:
+        """Run one engine call and return its audio in request order."""
+        assert self.omni is not None
+        try:
+            outputs = self.omni.generate(requests)
+        except Exception:
+            # Omni closes itself when generation fails
+            self.omni = None
+            raise
+
+        batch_audio: list[bytes | None] = [None] * len(requests)
+        for stage_outputs in outputs:
+            request_output = stage_outputs.request_output
+            if request_output is None or not request_output.outputs:
+                continue
+
+            multimodal_output = request_output.outputs[0].multimodal_output
+            if not multimodal_output or "audio" not in multimodal_output:
+                continue
+
+            request_index = _request_index_from(request_output.request_id)
+            if (
+                request_index is None
+                or request_index >= len(requests)
+                or batch_audio[request_index] is not None
+            ):
                 raise RuntimeError(
-                    f"No audio returned for batch indexes: {missing}"
+                    f"Unexpected request id: {request_output.request_id}"
                 )
-            audio_results.extend(
-                audio for audio in batch_audio if audio is not None
+            batch_audio[request_index] = _audio_bytes_from_multimodal_output(
+                multimodal_output
             )
-    finally:
-        close = getattr(omni, "close", None)
-        if close is not None:
-            close()
 
-    return audio_results
+        missing = [i for i, audio in enumerate(batch_audio) if audio is None]
+        if missing:
+            raise RuntimeError(
+                f"No audio returned for batch indexes: {missing}"
+            )
+        return [audio for audio in batch_audio if audio is not None]
+
+    @modal.method()
+    def synthesize(
+        self,
+        chunks: list[str],
+        generation_kwargs=None,
+    ) -> Iterator[bytes]:
+        """Yield the audio of each chunk in document order.
+
+        Chunks are scheduled in length-bucketed engine calls, see
+        ``plan_batches``. Each chunk is yielded as soon as it and every
+        chunk before it are done.
+        """
+        if not chunks:
+            return
+        if self.omni is None:
+            self._start_engine()
+
+        generation_kwargs = generation_kwargs or {}
+        speaker = generation_kwargs.get("speaker", QWEN_TTS_SPEAKER)
+        language = generation_kwargs.get("language", QWEN_TTS_LANGUAGE)
+        instructions = generation_kwargs.get("instructions", "")
+        max_new_tokens = generation_kwargs.get(
+            "max_new_tokens",
+            QWEN_TTS_MAX_NEW_TOKENS,
+        )
+        batches = plan_batches(
+            [len(chunk) for chunk in chunks],
+            max_batch_size=generation_kwargs.get(
+                "batch_size", QWEN_TTS_BATCH_SIZE
+            ),
+            max_batch_chars=generation_kwargs.get(
+                "max_batch_chars", QWEN_TTS_MAX_BATCH_CHARS
+            ),
+        )
+
+        start = time.perf_counter()
+        self.calls += 1
+        utilization: list[float] = []
+        with _gpu_utilization(utilization):
+            requests = [
+                _build_custom_voice_request(
+                    text=chunk,
+                    speaker=speaker,
+                    language=language,
+                    instructions=instructions,
+                    max_new_tokens=max_new_tokens,
+                )
+                for chunk in chunks
+            ]
+            done: dict[int, bytes] = {}
+            next_index = 0
+            for batch in batches:
+                audio = self._generate([requests[i] for i in batch])
+                done.update(zip(batch, audio))
+                while next_index in done:
+                    yield done.pop(next_index)
+                    next_index += 1
+
+        seconds = time.perf_counter() - start
+        self.last_call = {
+            "chunks": len(chunks),
+            "batches": len(batches),
+            "seconds": seconds,
+            "gpu_utilization": (
+                sum(utilization) / len(utilization) if utilization else None
+            ),
+        }
+        engine = (
+            f"cold, init took {self.init_seconds:.1f}s"
+            if self.calls == 1
+            else f"warm, call {self.calls}"
+        )
+        gpu = (
+            f", {self.last_call['gpu_utilization']:.0f}% GPU"
+            if utilization
+            else ""
+        )
+        print(
+            f"Generated {len(chunks)} chunks in {len(batches)} engine calls "
+            f"in {seconds:.1f}s{gpu} (engine {engine})"
+        )
+
+    @modal.method()
+    def stats(self) -> dict[str, Any]:
+        """Engine init time and the timings of the last synthesize call."""
+        return {
+            "init_seconds": self.init_seconds,
+            "calls": self.calls,
+            **self.last_call,
+        }
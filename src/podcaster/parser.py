@@ -1,80 +1,281 @@
+import bisect
+import functools
 import hashlib
-import os
+import heapq
+import re
+import time
 import typing as t
-from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from textwrap import dedent
+from html.parser import HTMLParser
+from pathlib import Path
+from textwrap import dedent, indent
 
-import feedparser
-from feedgen.feed import FeedGenerator
+import httpx
+import openai
 from loguru import logger
-from openai import OpenAI
+from openai.types.chat import ChatCompletionMessageParam
 from tenacity import (
+    RetryCallState,
     retry,
+    retry_if_exception_type,
     stop_after_attempt,
     wait_exponential,
 )
 
 from podcaster.config import (
-    ENV_OPENAI_API_KEY,
-    OPENROUTER_BASE_URL,
-    PODCAST_AUTHOR,
-    PODCAST_CATEGORIES,
-    PODCAST_DESCRIPTION,
-    PODCAST_FEED_NAME,
-    PODCAST_IMAGE,
-    PODCAST_NAME,
-    PODCAST_WEBSITE,
-    PUBLIC_BUCKET_URL,
+    LLM_CODE_PREVIEW_LINES,
+    LLM_MAP_REDUCE_MIN_CHARS,
+    LLM_MAX_ATTEMPTS,
+    LLM_MAX_CONCURRENT_REQUESTS,
+    LLM_PREPROCESSING_MODE,
+    LLM_PREPROCESSING_MODES,
+    LLM_PROMPT_VERSION,
+    LLM_SECTION_MAX_CHARS,
     RESULTS_DIR,
+    STATE_SPILL_DIR,
 )
+from podcaster.feed import FeedEntry, iter_feed_entries
+from podcaster.fetch import fetch_feed
+from podcaster.llm import (
+    complete,
+    estimate_tokens,
+    stream_complete,
+    wait_retry_after,
+)
+from podcaster.llm_cache import cache_key, get_llm_cache
+
+MIN_CONTENT_CHARS = 100
+
+
+class SpillableText:
+    """A large string that can be moved to a file and read back on access."""
+
+    __slots__ = ("_value", "_path")
+
+    def __init__(self, value: str | None = None):
+        self._value = value
+        self._path: Path | None = None
+
+    def get(self) -> str | None:
+        if self._value is None and self._path is not None:
+            return self._path.read_text()
+        return self._value
+
+    def set(self, value: str | None):
+        self._value = value
+        self._path = None
+
+    def spill(self, path: Path):
+        if self._value is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self._value)
+        self._path = path
+        self._value = None
+
+    def drop(self, path: Path):
+        """Forget the text, deleting its spill file at ``path`` if any."""
+        self._value = None
+        self._path = None
+        path.unlink(missing_ok=True)
 
 
-@dataclass
 class ParsedArticle:
-    title: str
-    summary: str
-    link: str
-    content: str
-    date_as_str: str
-    date: datetime = field(init=False)
-    is_valid: bool = field(init=False, default=True)
-    text_for_tts: str | None = field(init=False)
-    llm_summary: str | None = field(init=False)
-    llm_links: str | None = field(init=False)
-    id: str = field(init=False)
-    number: int = field(init=False)
-    podcast_url: str = field(init=False)
-
-    def __post_init__(self):
-        if len(self.content) <= 100:
-            self.is_valid = False
-
-        if not self.title.strip().endswith("."):
-            self.title = self.title.strip() + "."
-
-        self.date = datetime.fromisoformat(self.date_as_str)
-        self.text_for_tts = None
-        self.llm_summary = None
-        self.llm_links = None
-
-        self.id = hashlib.md5(self.link.encode()).hexdigest()
-        self.podcast_url = f"{PUBLIC_BUCKET_URL}/{RESULTS_DIR}{self.id}.mp3"
-
-    def preprocess_with_llm(self, model: str):
-        logger.info(f"Preprocessing article '{self.title}' with LLM...")
-        result = get_tts_text(
-            html_string=self.content,
-            article_title=self.title,
-            posted_date=self.date,
-            openrouter_model=model,
-            link=self.link,
+    """An article from the feed.
+
+    Equality and hashing go by ``id`` alone, so articles can be kept in
+    sets and dicts without comparing their text. ``content`` and
+    ``text_for_tts`` can be spilled to disk and are read back on access,
+    or dropped once the article is published.
+    """
+
+    __slots__ = (
+        "title",
+        "summary",
+        "link",
+        "date_as_str",
+        "date",
+        "is_valid",
+        "llm_summary",
+        "llm_links",
+        "id",
+        "content_hash",
+        "number",
+        "episode_key",
+        "_content",
+        "_text_for_tts",
+    )
+
+    def __init__(
+        self,
+        title: str,
+        summary: str,
+        link: str,
+        content: str,
+        date_as_str: str,
+    ):
+        if not title.strip().endswith("."):
+            title = title.strip() + "."
+
+        self.title = title
+        self.summary = summary
+        self.link = link
+        self.date_as_str = date_as_str
+        self.date = datetime.fromisoformat(date_as_str)
+        self.is_valid = len(content) > MIN_CONTENT_CHARS
+        self.llm_summary: str | None = None
+        self.llm_links: str | None = None
+        self.number: int
+
+        self.id = hashlib.md5(link.encode()).hexdigest()
+        self.content_hash = hashlib.md5(content.encode()).hexdigest()
+        self.episode_key = f"{RESULTS_DIR}{self.id}.mp3"
+        self._content = SpillableText(content)
+        self._text_for_tts = SpillableText()
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ParsedArticle):
+            return NotImplemented
+        return self.id == other.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    def __repr__(self) -> str:
+        return f"ParsedArticle(id={self.id!r}, title={self.title!r})"
+
+    @property
+    def content(self) -> str:
+        content = self._content.get()
+        assert content is not None
+        return content
+
+    @property
+    def text_for_tts(self) -> str | None:
+        return self._text_for_tts.get()
+
+    @text_for_tts.setter
+    def text_for_tts(self, value: str | None):
+        self._text_for_tts.set(value)
+
+    def _spill_paths(self, spill_dir: str) -> t.Tuple[Path, Path]:
+        directory = Path(spill_dir)
+        return (
+            directory / f"{self.id}.html",
+            directory / f"{self.id}.transcript.txt",
         )
+
+    def spill(self, spill_dir: str = STATE_SPILL_DIR):
+        """Move the article and transcript text out of memory."""
+        content_path, transcript_path = self._spill_paths(spill_dir)
+        self._content.spill(content_path)
+        self._text_for_tts.spill(transcript_path)
+
+    def drop_text(self, spill_dir: str = STATE_SPILL_DIR):
+        """Forget the article and transcript text, e.g. once published.
+
+        Only the metadata is needed for the feed afterwards, so nothing is
+        kept on disk either; ``content`` can't be read again.
+        """
+        content_path, transcript_path = self._spill_paths(spill_dir)
+        self._content.drop(content_path)
+        self._text_for_tts.drop(transcript_path)
+
+    def _llm_cache_key(self, model: str, mode: str) -> str:
+        return cache_key(
+            self.content_hash,
+            self.title,
+            self.link,
+            self.date_as_str,
+            model,
+            mode,
+            LLM_PROMPT_VERSION,
+        )
+
+    def _apply_llm_result(self, result: t.Dict[str, str]):
         self.text_for_tts = result["transcript"]
         self.llm_summary = result["summary"]
         self.llm_links = result["links"]
         logger.success("Preprocessing done.")
 
+    def preprocess_with_llm(
+        self,
+        model: str,
+        use_cache: bool = True,
+        mode: str = LLM_PREPROCESSING_MODE,
+    ):
+        if mode not in LLM_PREPROCESSING_MODES:
+            raise ValueError(f"Unknown preprocessing mode: {mode}")
+
+        key = self._llm_cache_key(model, mode)
+        result = get_llm_cache().get(key) if use_cache else None
+        if result is not None:
+            logger.info(f"Using cached preprocessing for '{self.title}'")
+        else:
+            logger.info(f"Preprocessing article '{self.title}' ({mode})...")
+            if mode != "llm":
+                get_text = functools.partial(
+                    get_tts_text_local, spoken_forms=mode == "hybrid"
+                )
+            elif len(self.content) >= LLM_MAP_REDUCE_MIN_CHARS:
+                get_text = get_tts_text_map_reduce
+            else:
+                get_text = get_tts_text
+            result = get_text(
+                html_string=self.content,
+                article_title=self.title,
+                posted_date=self.date,
+                openrouter_model=model,
+                link=self.link,
+            )
+            get_llm_cache().set(key, result)
+        self._apply_llm_result(result)
+
+    def stream_preprocess_with_llm(
+        self,
+        model: str,
+        use_cache: bool = True,
+        mode: str = LLM_PREPROCESSING_MODE,
+    ) -> t.Iterator[str]:
+        """Yield transcript text while the LLM writes it.
+
+        Once the stream ends the summary and links are set as well, exactly
+        as ``preprocess_with_llm`` would. Only the ``llm`` mode streams; the
+        local modes yield the whole transcript at once. Failures are not
+        retried here: wrap whatever consumes the text in
+        ``llm_stream_retry``.
+        """
+        if mode != "llm":
+            self.preprocess_with_llm(model, use_cache=use_cache, mode=mode)
+            assert self.text_for_tts is not None
+            yield self.text_for_tts
+            return
+
+        key = self._llm_cache_key(model, mode)
+        result = get_llm_cache().get(key) if use_cache else None
+        if result is not None:
+            logger.info(f"Using cached preprocessing for '{self.title}'")
+            yield result["transcript"]
+        else:
+            logger.info(f"Streaming preprocessing for '{self.title}'...")
+            stream_parser = TranscriptStreamParser()
+            for delta in stream_complete(
+                model=model,
+                messages=_tts_messages(
+                    html_string=self.content,
+                    article_title=self.title,
+                    link=self.link,
+                    posted_date=self.date,
+                ),
+                temperature=0.01,
+            ):
+                if ready := stream_parser.feed(delta):
+                    yield ready
+            result = stream_parser.finish()
+            get_llm_cache().set(key, result)
+        self._apply_llm_result(result)
+
     @property
     def podcast_title(self):
         return f"#{self.number} {self.title.removesuffix('.')}"
@@ -87,18 +288,53 @@ class ParsedArticle:
         return desc
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
+_TRANSCRIPT_RULES = """
+- Remove all metadata, HTML, and formatting not meant to be spoken.
+- Keep only text that should be read aloud — no stage directions, timestamps, or narrator labels.
+- Do not change the phrasing or words used by the original author
+- Normalize headings: # → Section Title: <text>, ## → Subsection Title: <text>.
+- Always include four newlines before and after sections, subsections, and other major breaks.
+- Use line breaks for pacing: one newline = short pause; two newlines = long pause or paragraph break.
+- Break long paragraphs into sentences ≤ ~20–25 words when possible; split long sentences at clause boundaries.
+- Convert ordered lists to spoken enumerations (e.g., One: <text>), one item per line.
+- Convert unordered lists to one bullet per line, with a short pause between items.
+- Replace quotation marks with "quote" and "end quote" markers. Put them on the same line as the quoted text.
+- For nested quotes, nest "quote" / "end quote" explicitly.
+- For inline links [text](url), replace with the <text> only; omit the URL unless it is critical to understanding (not common).
+- For ambiguous link anchors like "this" / "here", resolve by context to "quote this article end quote" (link in original article) or "quote this video end quote" (link in original article).
+- Treat code blocks as omitted or summarized: "(code block omitted; main idea: <short summary>)". Even if the code block is only one line.
+- Render inline code as normal text without special formatting.
+- Read shell/command lines slowly; add extra newlines before and after; prefix with Command:.
+- Replace images with descriptive alt/caption if present: "(image of <alt/caption>)".
+- For videos/podcasts, say "quote this video end quote" (link in original article) or "quote this podcast episode end quote" (link in original article).
+- Summarize tables instead of reading dense rows: "(table that shows <one-line summary>)".
+- Expand acronyms and abbreviations to spoken form (e.g., LLMs → large language models).
+- Normalize dates and times (e.g., 4PM → four P.M., 2025 → twenty twenty-five)
+- When the text shows emphasis, you can use double newlines before and after the emphasized text for effect.
+- Convert parentheticals to short asides on separate lines: "(aside: ...)".
+- Convert footnotes to "(footnote: <text>)" or "(citation: see link in original article)".
+- Replace emojis with words or remove if irrelevant.
+- For dialogue, put each speaker line on its own line and optionally include Speaker:.
+- QA checks before output: ensure no raw markdown tokens remain; flag unresolved links; warn on very long sentences.
+""".strip()
+
+_TRANSCRIPT_DISCLAIMER = (
+    "This transcript was automatically generated by a text to speech "
+    "system. For code, links, and images, please check the original article."
 )
-def get_tts_text(
-    html_string: str,
-    article_title: str,
-    link: str,
-    posted_date: datetime,
-    openrouter_model: str,
-) -> dict[str, str]:
-    sys_msg = dedent(f"""
+
+_TRANSCRIPT_INTRO_RULES = f"""
+- Always start with Article Title: <text> followed by two newlines.
+- Then say Date of publication: <text> followed by two newlines.
+- Then say "{_TRANSCRIPT_DISCLAIMER}" followed by two newlines.
+""".strip()
+
+
+_TTS_TRANSCRIPT_RULES = indent(
+    f"{_TRANSCRIPT_RULES}\n{_TRANSCRIPT_INTRO_RULES}", " " * 8
+)
+# Static, so providers can cache it as a prompt prefix across articles
+_TTS_SYSTEM_PROMPT = dedent(f"""
     You will receive an article in markdown format from a blog post.
     Your task is to produce three outputs wrapped in XML tags:
 
@@ -107,36 +343,7 @@ def get_tts_text(
     3. <links> - An unordered html list of the most relevant URLs mentioned in the article
 
     For the TRANSCRIPT section, follow these rules carefully:
-        - Remove all metadata, HTML, and formatting not meant to be spoken.
-        - Keep only text that should be read aloud — no stage directions, timestamps, or narrator labels.
-        - Do not change the phrasing or words used by the original author
-        - Normalize headings: # → Section Title: <text>, ## → Subsection Title: <text>.
-        - Always include four newlines before and after sections, subsections, and other major breaks.
-        - Use line breaks for pacing: one newline = short pause; two newlines = long pause or paragraph break.
-        - Break long paragraphs into sentences ≤ ~20–25 words when possible; split long sentences at clause boundaries.
-        - Convert ordered lists to spoken enumerations (e.g., One: <text>), one item per line.
-        - Convert unordered lists to one bullet per line, with a short pause between items.
-        - Replace quotation marks with "quote" and "end quote" markers. Put them on the same line as the quoted text.
-        - For nested quotes, nest "quote" / "end quote" explicitly.
-        - For inline links [text](url), replace with the <text> only; omit the URL unless it is critical to understanding (not common).
-        - For ambiguous link anchors like "this" / "here", resolve by context to "quote this article end quote" (link in original article) or "quote this video end quote" (link in original article).
-        - Treat code blocks as omitted or summarized: "(code block omitted; main idea: <short summary>)". Even if the code block is only one line.
-        - Render inline code as normal text without special formatting.
-        - Read shell/command lines slowly; add extra newlines before and after; prefix with Command:.
-        - Replace images with descriptive alt/caption if present: "(image of <alt/caption>)".
-        - For videos/podcasts, say "quote this video end quote" (link in original article) or "quote this podcast episode end quote" (link in original article).
-        - Summarize tables instead of reading dense rows: "(table that shows <one-line summary>)".
-        - Expand acronyms and abbreviations to spoken form (e.g., LLMs → large language models).
-        - Normalize dates and times (e.g., 4PM → four P.M., 2025 → twenty twenty-five)
-        - When the text shows emphasis, you can use double newlines before and after the emphasized text for effect.
-        - Convert parentheticals to short asides on separate lines: "(aside: ...)".
-        - Convert footnotes to "(footnote: <text>)" or "(citation: see link in original article)".
-        - Replace emojis with words or remove if irrelevant.
-        - For dialogue, put each speaker line on its own line and optionally include Speaker:.
-        - QA checks before output: ensure no raw markdown tokens remain; flag unresolved links; warn on very long sentences.
-        - Always start with Article Title: <text> followed by two newlines.
-        - Then say Date of publication: <text> followed by two newlines.
-        - Then say "This transcript was automatically generated by a text to speech system. For code, links, and images, please check the original article." followed by two newlines.
+{_TTS_TRANSCRIPT_RULES}
 
     For the SUMMARY section:
         - Write 2-3 sentences that capture the main points of the article
@@ -164,26 +371,265 @@ def get_tts_text(
     <p>
     <ul>
     [Markdown bullet list of links here]
-    <li><a href="{link}">Original article</a></li>
+    <li><a href="[original article link]">Original article</a></li>
     <li><a href="https://example.com">Example Link</a></li>
     </ul>
     </p>
     </links>
+""").strip("\n")
+
+
+def _tts_messages(
+    html_string: str,
+    article_title: str,
+    link: str,
+    posted_date: datetime,
+) -> t.List[ChatCompletionMessageParam]:
+    content = minify_for_llm(html_string, article_title)
+    usr_msg = f"""
+Article Title: {article_title}\n
+Date of publication: {posted_date.strftime("%B %d, %Y")}\n
+Original article link: {link}\n
+Content:\n{content}
+    """.strip()
+
+    return [
+        {"role": "system", "content": _TTS_SYSTEM_PROMPT},
+        {"role": "user", "content": usr_msg},
+    ]
+
+
+def _extract_sections(
+    result: str, tags: t.Sequence[str] = ("transcript", "summary", "links")
+) -> t.Dict[str, str]:
+    sections = {}
+    for tag in tags:
+        match = re.search(rf"<{tag}>(.*?)</{tag}>", result, re.DOTALL)
+        if not match:
+            raise ValueError(f"LLM response missing <{tag}> tags")
+        sections[tag] = match.group(1).strip()
+    return sections
+
+
+llm_retry = retry(
+    stop=stop_after_attempt(LLM_MAX_ATTEMPTS),
+    wait=wait_retry_after(wait_exponential(multiplier=1, min=2, max=10)),
+)
+
+
+def _log_stream_restart(retry_state: RetryCallState):
+    assert retry_state.outcome is not None
+    logger.warning(
+        f"LLM stream failed with {retry_state.outcome.exception()!r}, "
+        f"restarting from scratch (attempt {retry_state.attempt_number + 1})"
+    )
+
+
+# For callers consuming ``stream_preprocess_with_llm``. Streamed text can't
+# be taken back, so the whole consumer is restarted, not just the request.
+# A ValueError is a completion with missing tags, which ``llm_retry``
+# retries on the non-streamed path too.
+llm_stream_retry = retry(
+    retry=retry_if_exception_type(
+        (openai.OpenAIError, httpx.HTTPError, ValueError)
+    ),
+    stop=stop_after_attempt(LLM_MAX_ATTEMPTS),
+    wait=wait_retry_after(wait_exponential(multiplier=1, min=2, max=10)),
+    before_sleep=_log_stream_restart,
+)
+
+
+@llm_retry
+def get_tts_text(
+    html_string: str,
+    article_title: str,
+    link: str,
+    posted_date: datetime,
+    openrouter_model: str,
+) -> dict[str, str]:
+    completion = complete(
+        model=openrouter_model,
+        messages=_tts_messages(
+            html_string=html_string,
+            article_title=article_title,
+            link=link,
+            posted_date=posted_date,
+        ),
+        temperature=0.01,
+    )
+    result = completion.choices[0].message.content
+    if not isinstance(result, str):
+        raise ValueError("LLM did not return a string")
+
+    return _extract_sections(result)
+
+
+_SECTION_BREAK = re.compile(r"(?=<h[1-3][\s>])", re.IGNORECASE)
+_BLOCK_BREAK = re.compile(
+    r"(?<=</p>)|(?<=</ul>)|(?<=</ol>)|(?<=</pre>)|(?<=</blockquote>)",
+    re.IGNORECASE,
+)
+
+
+def split_article_sections(
+    html_string: str, max_chars: int = LLM_SECTION_MAX_CHARS
+) -> t.List[str]:
+    """Split article HTML on headings, packing pieces up to ``max_chars``.
+
+    Sections that are too long on their own are split further between
+    block elements, so no heading or paragraph is ever cut in half.
+    """
+    pieces = []
+    for section in _SECTION_BREAK.split(html_string):
+        if len(section) <= max_chars:
+            pieces.append(section)
+        else:
+            pieces.extend(_BLOCK_BREAK.split(section))
+
+    sections, current = [], ""
+    for piece in pieces:
+        if current.strip() and len(current) + len(piece) > max_chars:
+            sections.append(current)
+            current = ""
+        current += piece
+    if current.strip():
+        sections.append(current)
+    return sections
+
+
+@llm_retry
+def _get_section_transcript(
+    section_html: str,
+    section_index: int,
+    section_count: int,
+    article_title: str,
+    posted_date: datetime,
+    openrouter_model: str,
+) -> str:
+    if section_index == 0:
+        position_rules = _TRANSCRIPT_INTRO_RULES
+    else:
+        position_rules = (
+            "- This section continues directly from the previous one: do "
+            "not add a title, date, introduction or closing remarks."
+        )
+    transcript_rules = indent(
+        f"{_TRANSCRIPT_RULES}\n{position_rules}", " " * 8
+    )
+    sys_msg = dedent(f"""
+    You will receive one section of a longer blog post in markdown format.
+    Your task is to turn only this section into a transcript suitable for reading aloud by a text-to-speech system, wrapped in <transcript> tags.
+
+    Follow these rules carefully:
+{transcript_rules}
+
+    Output format:
+    <transcript>
+    [TTS-ready transcript here]
+    </transcript>
     """).strip("\n")
 
+    content = html_to_markdown(section_html)
     usr_msg = f"""
 Article Title: {article_title}\n
 Date of publication: {posted_date.strftime("%B %d, %Y")}\n
-Content:\n{html_string}
+Section {section_index + 1} of {section_count}:\n{content}
     """.strip()
 
-    client = OpenAI(
-        base_url=OPENROUTER_BASE_URL,
-        api_key=os.environ[ENV_OPENAI_API_KEY],
+    completion = complete(
+        model=openrouter_model,
+        messages=[
+            {"role": "system", "content": sys_msg},
+            {"role": "user", "content": usr_msg},
+        ],
+        temperature=0.01,
     )
+    result = completion.choices[0].message.content
+    if not isinstance(result, str):
+        raise ValueError("LLM did not return a string")
+    return _extract_sections(result, tags=("transcript",))["transcript"]
+
+
+@llm_retry
+def _get_summary_and_links(
+    html_string: str,
+    article_title: str,
+    link: str,
+    posted_date: datetime,
+    openrouter_model: str,
+    spoken_forms: bool = False,
+) -> t.Dict[str, str]:
+    """Ask only for show notes and, optionally, spoken forms of hard terms.
 
-    completion = client.chat.completions.create(
-        extra_body={},
+    With ``spoken_forms`` the result has a ``replacements`` entry with one
+    ``original => spoken form`` pair per line, see ``apply_spoken_forms``.
+    """
+    tags = ("summary", "links", "replacements")
+    if not spoken_forms:
+        tags = tags[:2]
+    replacements_output = (
+        "\n    3. <replacements> - Spoken forms for acronyms, abbreviations, dates and times in the article"
+        if spoken_forms
+        else ""
+    )
+    replacements_rules = (
+        dedent("""
+        For the REPLACEMENTS section:
+            - List acronyms, abbreviations, numbers, dates and times that a text-to-speech system would read badly
+            - Write one per line as: original => spoken form (e.g., LLMs => large language models, 4PM => four P.M.)
+            - Copy the original exactly as it appears in the article text
+            - Leave the section empty if there is nothing to replace
+        """)
+        if spoken_forms
+        else ""
+    )
+    replacements_format = (
+        "\n<replacements>\n[original => spoken form, one per line]\n</replacements>\n"
+        if spoken_forms
+        else ""
+    )
+    sys_msg = dedent(f"""
+    You will receive an article in markdown format from a blog post.
+    Your task is to produce {len(tags)} outputs wrapped in XML tags:
+
+    1. <summary> - A 2-3 sentence episode summary for podcast show notes formatted as html inside a single paragraph tag
+    2. <links> - An unordered html list of the most relevant URLs mentioned in the article{replacements_output}
+
+    For the SUMMARY section:
+        - Write 2-3 sentences that capture the main points of the article
+        - Write as if you were the author summarizing your own work
+
+    For the LINKS section:
+        - The first link should always be the original article link with description "Original article" - this will be provided below.
+        - Extract all meaningful URLs mentioned in the article
+        - Include article references, tools, papers, videos, etc.
+    {indent(replacements_rules, " " * 4)}
+    Output format:
+    <summary>
+    <p>
+    [Episode summary here]
+    </p>
+    </summary>
+
+    <links>
+    <p>
+    <ul>
+    <li><a href="[original article link]">Original article</a></li>
+    <li><a href="https://example.com">Example Link</a></li>
+    </ul>
+    </p>
+    </links>
+    {indent(replacements_format, " " * 4)}""").strip("\n")
+
+    content = minify_for_llm(html_string, article_title)
+    usr_msg = f"""
+Article Title: {article_title}\n
+Date of publication: {posted_date.strftime("%B %d, %Y")}\n
+Original article link: {link}\n
+Content:\n{content}
+    """.strip()
+
+    completion = complete(
         model=openrouter_model,
         messages=[
             {"role": "system", "content": sys_msg},
@@ -194,82 +640,749 @@ Content:\n{html_string}
     result = completion.choices[0].message.content
     if not isinstance(result, str):
         raise ValueError("LLM did not return a string")
+    return _extract_sections(result, tags=tags)
+
+
+def get_tts_text_map_reduce(
+    html_string: str,
+    article_title: str,
+    link: str,
+    posted_date: datetime,
+    openrouter_model: str,
+    max_workers: int = LLM_MAX_CONCURRENT_REQUESTS,
+) -> t.Dict[str, str]:
+    """Preprocess a long article section by section, in parallel.
+
+    Summary and links come from one separate, short call over the whole
+    article. Section transcripts are stitched back in document order.
+    """
+    sections = split_article_sections(html_string)
+    logger.info(f"Preprocessing {len(sections)} sections in parallel")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        summary_future = executor.submit(
+            _get_summary_and_links,
+            html_string=html_string,
+            article_title=article_title,
+            link=link,
+            posted_date=posted_date,
+            openrouter_model=openrouter_model,
+        )
+        transcript_futures = [
+            executor.submit(
+                _get_section_transcript,
+                section_html=section,
+                section_index=index,
+                section_count=len(sections),
+                article_title=article_title,
+                posted_date=posted_date,
+                openrouter_model=openrouter_model,
+            )
+            for index, section in enumerate(sections)
+        ]
+        transcripts = [future.result() for future in transcript_futures]
+        result = summary_future.result()
+
+    result["transcript"] = "\n\n\n\n".join(transcripts)
+    return result
+
+
+_ONES = (
+    "zero one two three four five six seven eight nine ten eleven twelve "
+    "thirteen fourteen fifteen sixteen seventeen eighteen nineteen"
+).split()
+_TENS = "_ _ twenty thirty forty fifty sixty seventy eighty ninety".split()
+_ORDINALS = {
+    "one": "first",
+    "two": "second",
+    "three": "third",
+    "five": "fifth",
+    "eight": "eighth",
+    "nine": "ninth",
+    "twelve": "twelfth",
+}
+
+
+def _number_to_words(n: int) -> str:
+    if n < 20:
+        return _ONES[n]
+    if n < 100:
+        tens, ones = divmod(n, 10)
+        return _TENS[tens] + (f"-{_ONES[ones]}" if ones else "")
+    if n < 1000:
+        hundreds, rest = divmod(n, 100)
+        words = f"{_ONES[hundreds]} hundred"
+        return f"{words} {_number_to_words(rest)}" if rest else words
+    thousands, rest = divmod(n, 1000)
+    words = f"{_number_to_words(thousands)} thousand"
+    return f"{words} {_number_to_words(rest)}" if rest else words
+
+
+def _ordinal_to_words(n: int) -> str:
+    words = _number_to_words(n)
+    head, sep, last = words.rpartition("-" if "-" in words else " ")
+    if last in _ORDINALS:
+        last = _ORDINALS[last]
+    elif last.endswith("y"):
+        last = last[:-1] + "ieth"
+    else:
+        last += "th"
+    return head + sep + last
+
+
+def _year_to_words(year: int) -> str:
+    century, rest = divmod(year, 100)
+    if not 10 <= century <= 99 or (century % 10 == 0 and rest < 10):
+        return _number_to_words(year)
+    if rest == 0:
+        return f"{_number_to_words(century)} hundred"
+    if rest < 10:
+        return f"{_number_to_words(century)} oh {_ONES[rest]}"
+    return f"{_number_to_words(century)} {_number_to_words(rest)}"
 
-    import re
 
-    transcript_match = re.search(
-        r"<transcript>(.*?)</transcript>", result, re.DOTALL
+def spoken_date(date: datetime) -> str:
+    """E.g. ``October eighteenth, twenty twenty-six``."""
+    return (
+        f"{date.strftime('%B')} {_ordinal_to_words(date.day)}, "
+        f"{_year_to_words(date.year)}"
     )
-    if not transcript_match:
-        raise ValueError("LLM response missing <transcript> tags")
-    transcript = transcript_match.group(1).strip()
 
-    summary_match = re.search(r"<summary>(.*?)</summary>", result, re.DOTALL)
-    if not summary_match:
-        raise ValueError("LLM response missing <summary> tags")
-    summary = summary_match.group(1).strip()
 
-    links_match = re.search(r"<links>(.*?)</links>", result, re.DOTALL)
-    if not links_match:
-        raise ValueError("LLM response missing <links> tags")
-    links = links_match.group(1).strip()
+_EMOJI = re.compile(
+    "[\U0001f000-\U0001faff\u2600-\u27bf\u2b00-\u2bff\ufe0f\u200d]+"
+)
+_CURLY_QUOTES = re.compile(r"“([^”\n]*)”")
+_STRAIGHT_QUOTES = re.compile(r'"([^"\n]*)"')
+_SHELL_CLASS = re.compile(r"\blanguage-(bash|sh|shell|console|zsh)\b")
+_VIDEO_HOSTS = ("youtube.com", "youtu.be", "vimeo.com")
+_PODCAST_HOSTS = ("spotify.com", "podcasts.apple.com", "overcast.fm")
+_VAGUE_ANCHORS = {"this", "here", "link", "this link", "this post"}
+
+
+_EXPONENT = re.compile(r"[-−+]?(\d+|[a-z])")
+# No space after an opening bracket or before punctuation and closing ones
+_TIGHT_OPEN = re.compile(r"([(\[]) ")
+_TIGHT_CLOSE = re.compile(r" ([.,;:!?)\]])")
+
+
+class _ArticleHTMLParser(HTMLParser):
+    """Walk article HTML, leaving the output format to subclasses.
+
+    Text goes into a stack of buffers: ``_push`` starts collecting the text
+    of an element and ``_pop`` returns it. Skipped elements never reach the
+    subclass hooks, embedded media goes to ``_embed`` and superscripts, told
+    apart as footnote markers or not, to ``_superscript``.
+    """
+
+    _SKIPPED = {"script", "style", "svg", "noscript", "button", "form"}
+    _BLOCKS = {
+        "p", "div", "section", "article", "header", "footer", "figure",
+        "dl", "dt", "dd", "details", "summary",
+    }  # fmt: skip
+    _MEDIA = {"iframe", "video", "audio"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._buffers: t.List[t.List[str]] = [[]]
+        self._skipping = 0
+        self._pre = 0
+        self._lists: t.List[t.List[int]] = []
+        self._sup_markers: t.List[bool] = []
+
+    def _write(self, text: str):
+        self._buffers[-1].append(text)
+
+    def _push(self):
+        self._buffers.append([])
+
+    def _pop(self) -> str:
+        return "".join(self._buffers.pop()).strip()
+
+    def _drain(self) -> str:
+        """Close any elements left open and return all the text."""
+        while len(self._buffers) > 1:
+            text = self._pop()
+            self._write(text)
+        return "".join(self._buffers[0])
+
+    def _start(self, tag: str, attributes: t.Dict[str, str]):
+        pass
+
+    def _end(self, tag: str):
+        pass
+
+    def _embed(self, media: str | None, src: str):
+        """``media`` is "podcast", "video" or None for other embeds."""
+
+    def _superscript(self, text: str, footnote: bool):
+        pass
 
-    return {"transcript": transcript, "summary": summary, "links": links}
+    def handle_starttag(
+        self, tag: str, attrs: t.List[t.Tuple[str, str | None]]
+    ):
+        attributes = {key: value or "" for key, value in attrs}
+        if tag in self._SKIPPED:
+            self._skipping += 1
+        if self._skipping:
+            return
 
+        if tag in self._BLOCKS:
+            self._write("\n\n")
+        if tag in self._MEDIA:
+            src = attributes.get("src", "")
+            if tag == "audio" or any(h in src for h in _PODCAST_HOSTS):
+                media = "podcast"
+            elif tag == "video" or any(h in src for h in _VIDEO_HOSTS):
+                media = "video"
+            else:
+                media = None
+            self._embed(media, src)
+            self._skipping += 1
+            return
+        if tag == "sup":
+            self._sup_markers.append(
+                "footnote" in attributes.get("class", "")
+                or attributes.get("id", "").startswith("fn")
+            )
+            self._push()
+            return
+        if tag == "a" and self._sup_markers:
+            if attributes.get("href", "").startswith("#"):
+                self._sup_markers[-1] = True
+        self._start(tag, attributes)
 
-def get_articles(feed_url: str) -> t.List[ParsedArticle]:
-    feed = feedparser.parse(feed_url)
+    def handle_endtag(self, tag: str):
+        if tag in self._SKIPPED or tag in self._MEDIA:
+            self._skipping = max(0, self._skipping - 1)
+            return
+        if self._skipping:
+            return
 
-    articles = [
-        ParsedArticle(
-            title=fe.title,
-            summary=fe.summary,
-            link=fe.link,
-            content=fe.content[0].value,
-            date_as_str=fe.published,
+        if tag == "sup" and self._sup_markers:
+            text = self._pop()
+            self._superscript(text, self._sup_markers.pop())
+        else:
+            self._end(tag)
+        if tag in self._BLOCKS:
+            self._write("\n\n")
+
+    def handle_data(self, data: str):
+        if self._skipping:
+            return
+        if not self._pre:
+            data = re.sub(r"\s+", " ", data)
+        self._write(data)
+
+
+class SpeechRenderer(_ArticleHTMLParser):
+    """Render article HTML as TTS-ready text, following the transcript rules.
+
+    This covers the mechanical rules (headings, lists, quotes, code, images,
+    links, media and tables) and leaves wording untouched, so acronyms and
+    dates in the body are read as written.
+    """
+
+    # Major breaks get four newlines; everything else collapses to at most two
+    _BREAK = "\x00"
+
+    def __init__(self):
+        super().__init__()
+        self._shell = False
+        self._footnotes = 0
+        self._figure_described = False
+        self._table_caption = ""
+        self._href = ""
+
+    def _written(self) -> str:
+        return "".join(self._buffers[-1]).rstrip()
+
+    def _start(self, tag: str, attributes: t.Dict[str, str]):
+        if tag in ("div", "section", "ol") and "footnote" in attributes.get(
+            "class", ""
+        ):
+            self._footnotes += 1
+        if tag == "figure":
+            self._figure_described = False
+
+        if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            self._push()
+        elif tag in ("ul", "ol"):
+            # A nested list hangs off the item it is in
+            if self._lists and (written := self._written()):
+                if written[-1] not in ".!?:;":
+                    self._buffers[-1] = [f"{written}:"]
+            self._lists.append([tag == "ol", 0])
+            self._write("\n")
+        elif tag == "li":
+            self._push()
+        elif tag in ("blockquote", "q", "a", "figcaption", "caption"):
+            if tag == "a":
+                self._href = attributes.get("href", "")
+            self._push()
+        elif tag == "pre":
+            self._pre += 1
+            self._shell = bool(
+                _SHELL_CLASS.search(attributes.get("class", ""))
+            )
+            self._push()
+        elif tag == "code" and self._pre:
+            self._shell = self._shell or bool(
+                _SHELL_CLASS.search(attributes.get("class", ""))
+            )
+        elif tag == "table":
+            self._table_caption = ""
+            self._push()
+        elif tag == "br":
+            self._write("\n")
+        elif tag == "hr":
+            self._write(self._BREAK)
+        elif tag == "img" and (alt := attributes.get("alt", "").strip()):
+            self._figure_described = True
+            self._write(f" (image of {alt}) ")
+
+    def _embed(self, media: str | None, src: str):
+        if media == "podcast":
+            media = "podcast episode"
+        if media:
+            self._write(
+                f"\n\nquote this {media} end quote "
+                "(link in original article)\n\n"
+            )
+
+    def _superscript(self, text: str, footnote: bool):
+        if footnote:
+            self._write(f" (footnote {text})")
+        elif _EXPONENT.fullmatch(text):
+            self._write(f" to the power of {text} ")
+        else:
+            self._write(text)
+
+    def _end(self, tag: str):
+        if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            label = "Section Title" if tag == "h1" else "Subsection Title"
+            self._write(f"{self._BREAK}{label}: {self._pop()}{self._BREAK}")
+        elif tag in ("ul", "ol") and self._lists:
+            self._lists.pop()
+            self._write("\n")
+        elif tag == "li" and len(self._buffers) > 1:
+            text = self._pop()
+            if self._footnotes:
+                text = f"(footnote: {text})"
+            else:
+                # A full stop keeps items apart once lines are joined
+                if text and text[-1] not in ".!?:;)":
+                    text += "."
+                if self._lists and self._lists[-1][0]:
+                    self._lists[-1][1] += 1
+                    number = _number_to_words(self._lists[-1][1])
+                    text = f"{number.capitalize()}: {text}"
+            self._write(f"{text}\n")
+        elif tag == "blockquote" and len(self._buffers) > 1:
+            self._write(f"\n\nquote {self._pop()} end quote\n\n")
+        elif tag == "q" and len(self._buffers) > 1:
+            self._write(f"quote {self._pop()} end quote")
+        elif tag == "a" and len(self._buffers) > 1:
+            text = self._pop()
+            if text.lower() in _VAGUE_ANCHORS:
+                media = (
+                    "video"
+                    if any(h in self._href for h in _VIDEO_HOSTS)
+                    else "article"
+                )
+                text = (
+                    f"quote this {media} end quote (link in original article)"
+                )
+            self._write(f" {text} ")
+        elif tag == "figcaption" and len(self._buffers) > 1:
+            caption = self._pop()
+            if caption and not self._figure_described:
+                self._write(f" (image of {caption}) ")
+        elif tag == "caption" and len(self._buffers) > 1:
+            self._table_caption = self._pop()
+        elif tag == "pre" and self._pre:
+            self._pre -= 1
+            code = self._pop()
+            lines = [line for line in code.splitlines() if line.strip()]
+            if self._shell and len(lines) == 1:
+                command = lines[0].strip().removeprefix("$ ")
+                self._write(f"{self._BREAK}Command: {command}{self._BREAK}")
+            else:
+                self._write("\n\n(code block omitted)\n\n")
+        elif tag == "table" and len(self._buffers) > 1:
+            self._pop()
+            if self._table_caption:
+                self._write(
+                    f"\n\n(table that shows {self._table_caption})\n\n"
+                )
+            else:
+                self._write("\n\n(table omitted)\n\n")
+        elif tag in ("div", "section", "ol") and self._footnotes:
+            self._footnotes -= 1
+
+    def render(self) -> str:
+        text = _EMOJI.sub("", self._drain())
+        text = _CURLY_QUOTES.sub(r"quote \1 end quote", text)
+        text = _STRAIGHT_QUOTES.sub(r"quote \1 end quote", text)
+        lines = [
+            _TIGHT_CLOSE.sub(
+                r"\1", _TIGHT_OPEN.sub(r"\1", re.sub(r"[ \t]+", " ", line))
+            ).strip()
+            for line in text.split("\n")
+        ]
+        text = re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+        text = re.sub(rf"\s*{self._BREAK}[\s{self._BREAK}]*", "\n\n\n\n", text)
+        return text.strip()
+
+
+def html_to_speech(html_string: str) -> str:
+    renderer = SpeechRenderer()
+    renderer.feed(html_string)
+    renderer.close()
+    return renderer.render()
+
+
+_LANGUAGE_CLASS = re.compile(r"\blanguage-([\w+-]+)")
+
+
+class MarkdownMinifier(_ArticleHTMLParser):
+    """Convert article HTML to compact markdown for LLM prompts.
+
+    Attributes, highlighting spans and decorative markup are dropped, code
+    blocks are cut down to their first lines, and whitespace is collapsed.
+    Only the text and the links the LLM actually needs survive.
+    """
+
+    _BLOCKS = _ArticleHTMLParser._BLOCKS | {"figcaption", "table"}
+    _INLINE = {"em": "*", "i": "*", "strong": "**", "b": "**", "code": "`"}
+
+    def __init__(self, code_preview_lines: int = LLM_CODE_PREVIEW_LINES):
+        super().__init__()
+        self.code_preview_lines = code_preview_lines
+        self._language = ""
+        self._hrefs: t.List[str] = []
+
+    def _start(self, tag: str, attributes: t.Dict[str, str]):
+        if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            self._write(f"\n\n{'#' * int(tag[1])} ")
+        elif tag in ("ul", "ol"):
+            self._lists.append([tag == "ol", 0])
+        elif tag == "li" and self._lists:
+            ordered, count = self._lists[-1]
+            self._lists[-1][1] = count + 1
+            marker = f"{count + 1}." if ordered else "-"
+            self._write(f"\n{'  ' * (len(self._lists) - 1)}{marker} ")
+        elif tag == "blockquote":
+            self._push()
+        elif tag == "pre":
+            self._pre += 1
+            self._language = ""
+            self._push()
+        elif tag == "a":
+            self._hrefs.append(attributes.get("href", ""))
+            self._push()
+        elif tag in self._INLINE and not self._pre:
+            self._write(self._INLINE[tag])
+        elif tag == "img" and (alt := attributes.get("alt", "").strip()):
+            self._write(f"![{alt}]")
+        elif tag == "tr":
+            self._write("\n|")
+        elif tag in ("td", "th"):
+            self._write(" ")
+        elif tag == "br":
+            self._write("\n")
+        elif tag == "hr":
+            self._write("\n\n---\n\n")
+
+        if self._pre and tag in ("pre", "code"):
+            language = _LANGUAGE_CLASS.search(attributes.get("class", ""))
+            self._language = self._language or (
+                language.group(1) if language else ""
+            )
+
+    def _embed(self, media: str | None, src: str):
+        if src:
+            self._write(f"\n\n[embedded {media or 'embed'}]({src})\n\n")
+
+    def _superscript(self, text: str, footnote: bool):
+        if footnote:
+            self._write(f"[^{text}]")
+        elif _EXPONENT.fullmatch(text):
+            self._write(f"^{text}")
+        else:
+            self._write(text)
+
+    def _end(self, tag: str):
+        if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            self._write("\n\n")
+        elif tag in ("ul", "ol") and self._lists:
+            self._lists.pop()
+            if not self._lists:
+                self._write("\n\n")
+        elif tag == "blockquote" and len(self._buffers) > 1:
+            text = re.sub(r"\n{3,}", "\n\n", self._pop())
+            quoted = "\n".join(
+                f"> {line}".rstrip() for line in text.splitlines()
+            )
+            self._write(f"\n\n{quoted}\n\n")
+        elif tag == "pre" and self._pre and len(self._buffers) > 1:
+            self._pre -= 1
+            lines = "".join(self._buffers.pop()).strip("\n").splitlines()
+            preview = lines[: self.code_preview_lines]
+            if len(lines) > len(preview):
+                preview.append(f"... ({len(lines) - len(preview)} more lines)")
+            code = "\n".join(preview)
+            self._write(f"\n\n```{self._language}\n{code}\n```\n\n")
+        elif tag == "a" and self._hrefs and len(self._buffers) > 1:
+            href = self._hrefs.pop()
+            text = self._pop()
+            if href and not href.startswith("#") and text:
+                self._write(f"[{text}]({href})")
+            else:
+                self._write(text)
+        elif tag in self._INLINE and not self._pre:
+            self._write(self._INLINE[tag])
+        elif tag in ("td", "th"):
+            self._write(" |")
+
+    def render(self) -> str:
+        lines, in_code = [], False
+        for line in self._drain().split("\n"):
+            if line.startswith("```"):
+                in_code = not in_code
+            elif not in_code:
+                if not re.match(r"\s*(?:-|\d+\.) ", line):
+                    line = line.lstrip()
+                line = re.sub(r"(?<=\S) {2,}", " ", line)
+            lines.append(line.rstrip())
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def html_to_markdown(
+    html_string: str, code_preview_lines: int = LLM_CODE_PREVIEW_LINES
+) -> str:
+    minifier = MarkdownMinifier(code_preview_lines=code_preview_lines)
+    minifier.feed(html_string)
+    minifier.close()
+    return minifier.render()
+
+
+def minify_for_llm(html_string: str, article_title: str) -> str:
+    """``html_to_markdown``, logging how many prompt tokens it saved."""
+    markdown = html_to_markdown(html_string)
+    before = estimate_tokens(html_string)
+    after = estimate_tokens(markdown)
+    logger.info(
+        f"Minified '{article_title}' for the LLM: ~{before} -> ~{after} "
+        f"tokens ({1 - after / before:.0%} fewer)"
+    )
+    return markdown
+
+
+def apply_spoken_forms(text: str, replacements: str) -> str:
+    """Apply ``original => spoken form`` lines as whole-word substitutions."""
+    spoken_forms = {}
+    for line in replacements.splitlines():
+        original, sep, spoken = line.strip().removeprefix("- ").partition("=>")
+        if sep and original.strip() and spoken.strip():
+            spoken_forms[original.strip()] = spoken.strip()
+    if not spoken_forms:
+        return text
+
+    pattern = re.compile(
+        r"(?<!\w)(?:"
+        + "|".join(
+            re.escape(original)
+            for original in sorted(spoken_forms, key=len, reverse=True)
         )
-        for fe in feed.entries
-    ]
-    articles = sorted(articles, key=lambda x: x.date, reverse=False)
+        + r")(?!\w)"
+    )
+    return pattern.sub(lambda match: spoken_forms[match.group(0)], text)
 
-    for index, article in enumerate(articles):
-        article.number = index + 1
 
-    articles = [a for a in articles if a.is_valid]
+def get_tts_text_local(
+    html_string: str,
+    article_title: str,
+    link: str,
+    posted_date: datetime,
+    openrouter_model: str,
+    spoken_forms: bool = False,
+) -> t.Dict[str, str]:
+    """Render the transcript locally; the LLM only writes the show notes.
 
-    return articles
+    With ``spoken_forms`` the same call also returns spoken forms for the
+    acronyms and dates that the local renderer reads as written.
+    """
+    start = time.perf_counter()
+    body = html_to_speech(html_string)
+    logger.info(
+        f"Rendered transcript locally in "
+        f"{(time.perf_counter() - start) * 1000:.1f}ms"
+    )
 
+    result = _get_summary_and_links(
+        html_string=html_string,
+        article_title=article_title,
+        link=link,
+        posted_date=posted_date,
+        openrouter_model=openrouter_model,
+        spoken_forms=spoken_forms,
+    )
+    if replacements := result.pop("replacements", None):
+        body = apply_spoken_forms(body, replacements)
 
-def generate_podcast_feed_from(
-    articles: t.List[ParsedArticle], podcast_feed_name: str = PODCAST_FEED_NAME
-):
-    fg = FeedGenerator()
-    fg.load_extension("podcast")
-
-    fg.podcast.itunes_category(PODCAST_CATEGORIES)  # ty: ignore[unresolved-attribute]
-    fg.title(PODCAST_NAME)
-    fg.description(PODCAST_DESCRIPTION)
-    fg.link(href=PODCAST_WEBSITE)
-    fg.logo(PODCAST_IMAGE)
-    fg.author(PODCAST_AUTHOR)
-    fg.podcast.itunes_author(PODCAST_AUTHOR.get("name"))  # ty: ignore[unresolved-attribute]
-    fg.podcast.itunes_explicit("no")  # ty: ignore[unresolved-attribute]
-    fg.podcast.itunes_image(PODCAST_IMAGE)  # ty: ignore[unresolved-attribute]
-    fg.podcast.itunes_owner(  # ty: ignore[unresolved-attribute]
-        name=PODCAST_AUTHOR.get("name"), email=PODCAST_AUTHOR.get("email")
+    intro = (
+        f"Article Title: {article_title}\n\n"
+        f"Date of publication: {spoken_date(posted_date)}\n\n"
+        f"{_TRANSCRIPT_DISCLAIMER}\n\n"
     )
-    fg.podcast.itunes_summary(PODCAST_DESCRIPTION)  # ty: ignore[unresolved-attribute]
+    result["transcript"] = intro + body
+    return result
+
+
+class TranscriptStreamParser:
+    """Incrementally pull finished sentences out of a streamed completion.
 
-    for article in articles:
-        fe = fg.add_entry()
-        fe.id(article.podcast_url)
-        fe.title(article.podcast_title)
-        fe.link(href=article.link)
-        fe.content(article.podcast_description, type="CDATA")
-        fe.enclosure(article.podcast_url, 0, "audio/mpeg")
-        fe.published(article.date)
+    Text inside ``<transcript>`` is released up to the last sentence or
+    line boundary seen so far; everything else is kept until ``finish``.
+    Only the unreleased tail is scanned, so each delta costs time in its
+    own length rather than in everything received so far.
+    """
 
-    fg.rss_file(podcast_feed_name)
-    logger.success(f"Generated podcast feed with {len(articles)} articles")
+    _OPEN = "<transcript>"
+    _CLOSE = "</transcript>"
+    _BOUNDARY = re.compile(r"""[.!?]["')\]]*\s|\n""")
+    # Characters a boundary match can hold before its closing whitespace
+    _BOUNDARY_PREFIX = ".!?\"')]"
 
-    return podcast_feed_name
+    def __init__(self):
+        self.parts: t.List[str] = []
+        self.inside = False
+        self.closed = False
+        # Unreleased transcript text, or the tail that may hold _OPEN
+        self.pending = ""
+        # No boundary starts in pending[:scanned], no _CLOSE in
+        # pending[:close_from]
+        self.scanned = 0
+        self.close_from = 0
+
+    def feed(self, delta: str) -> str:
+        self.parts.append(delta)
+        if self.closed:
+            return ""
+        self.pending += delta
+        if not self.inside:
+            start = self.pending.find(self._OPEN)
+            if start < 0:
+                self.pending = self.pending[-(len(self._OPEN) - 1) :]
+                return ""
+            self.pending = self.pending[start + len(self._OPEN) :]
+            self.inside = True
+
+        end = self.pending.find(self._CLOSE, self.close_from)
+        if end >= 0:
+            ready = self.pending[:end]
+            self.pending = ""
+            self.closed = True
+            return ready
+        self.close_from = max(0, len(self.pending) - len(self._CLOSE) + 1)
+
+        # Hold back anything that could be the start of the closing tag
+        region_end = max(len(self.pending) - len(self._CLOSE), self.scanned)
+        boundary = 0
+        for match in self._BOUNDARY.finditer(
+            self.pending, self.scanned, region_end
+        ):
+            boundary = match.end()
+        # A boundary cut off at region_end may still complete
+        scanned = max(region_end, boundary)
+        while (
+            scanned > boundary
+            and self.pending[scanned - 1] in self._BOUNDARY_PREFIX
+        ):
+            scanned -= 1
+
+        ready = self.pending[:boundary]
+        self.pending = self.pending[boundary:]
+        self.scanned = scanned - boundary
+        self.close_from = max(0, self.close_from - boundary)
+        return ready
+
+    def finish(self) -> t.Dict[str, str]:
+        return _extract_sections("".join(self.parts))
+
+
+def preprocess_articles(
+    articles: t.List[ParsedArticle],
+    model: str,
+    use_cache: bool = True,
+    mode: str = LLM_PREPROCESSING_MODE,
+    max_workers: int = LLM_MAX_CONCURRENT_REQUESTS,
+) -> t.List[ParsedArticle]:
+    """Preprocess articles concurrently, returning the ones that failed.
+
+    Requests share the module rate limiter, so ``max_workers`` only caps
+    how many are in flight; RPM/TPM limits are enforced by the limiter.
+    """
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                article.preprocess_with_llm,
+                model,
+                use_cache=use_cache,
+                mode=mode,
+            ): article
+            for article in articles
+        }
+        for future in as_completed(futures):
+            article = futures[future]
+            try:
+                future.result()
+            except Exception:
+                logger.exception(f"Failed to preprocess '{article.title}'")
+                failed.append(article)
+    return failed
+
+
+def get_articles(
+    feed_url: str, limit: int | None = None
+) -> t.List[ParsedArticle]:
+    feed = fetch_feed(feed_url)
+    assert feed.content is not None
+    return parse_articles(feed.content, limit=limit)
+
+
+def parse_articles(
+    feed_content: bytes, limit: int | None = None
+) -> t.List[ParsedArticle]:
+    """Parse the feed's valid articles, oldest first.
+
+    With ``limit`` only the newest ``limit`` valid entries are kept (in a
+    heap, while streaming), and only those become ``ParsedArticle``s.
+    Episode numbers still count every entry in the feed.
+    """
+    all_keys = []
+    newest: t.List[t.Tuple[datetime, int, FeedEntry]] = []
+    for index, entry in enumerate(iter_feed_entries(feed_content)):
+        key = (datetime.fromisoformat(entry.published), index)
+        all_keys.append(key)
+        if len(entry.content) <= MIN_CONTENT_CHARS:
+            continue
+        if limit is None or len(newest) < limit:
+            heapq.heappush(newest, (*key, entry))
+        elif limit > 0:
+            heapq.heappushpop(newest, (*key, entry))
+
+    all_keys.sort()
+    articles = []
+    for date, index, entry in sorted(newest):
+        article = ParsedArticle(
+            title=entry.title,
+            summary=entry.summary,
+            link=entry.link,
+            content=entry.content,
+            date_as_str=entry.published,
+        )
+        article.number = bisect.bisect_left(all_keys, (date, index)) + 1
+        articles.append(article)
+    return articles
@@ -0,0 +1,128 @@
+import queue
+import threading
+import time
+import typing as t
+from dataclasses import dataclass
+
+from loguru import logger
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    name: str
+    func: t.Callable[[t.Any], t.Any]
+    workers: int = 1
+    queue_size: int | None = None
+
+
+@dataclass
+class StageFailure:
+    stage: str
+    error: Exception
+
+
+def _run_stage_worker(
+    stage: Stage,
+    inbox: queue.Queue,
+    outbox: queue.Queue,
+):
+    while True:
+        message = inbox.get()
+        if message is _DONE:
+            return
+
+        index, item, value = message
+        if not isinstance(value, StageFailure):
+            start = time.perf_counter()
+            try:
+                value = stage.func(value)
+                logger.info(
+                    f"Stage '{stage.name}' finished item {index} in "
+                    f"{time.perf_counter() - start:.1f}s"
+                )
+            except Exception as exc:
+                logger.exception(
+                    f"Stage '{stage.name}' failed on item {index}"
+                )
+                value = StageFailure(stage=stage.name, error=exc)
+        outbox.put((index, item, value))
+
+
+def _supervise(
+    items: t.Sequence[t.Any],
+    stages: t.Sequence[Stage],
+    queues: t.List[queue.Queue],
+    workers: t.List[t.List[threading.Thread]],
+):
+    for index, item in enumerate(items):
+        queues[0].put((index, item, item))
+
+    for stage_index, stage in enumerate(stages):
+        for _ in range(stage.workers):
+            queues[stage_index].put(_DONE)
+        for worker in workers[stage_index]:
+            worker.join()
+
+    queues[-1].put(_DONE)
+
+
+def run_pipeline(
+    items: t.Sequence[t.Any],
+    stages: t.Sequence[Stage],
+    queue_size: int = 1,
+) -> t.Iterator[t.Tuple[t.Any, t.Any]]:
+    """Run items through the stages concurrently, yielding in input order.
+
+    Each stage has its own pool of worker threads and reads from a bounded
+    queue fed by the previous stage, so item N+1 can be in one stage while
+    item N is in the next one. Yields ``(item, result)`` pairs where
+    ``result`` is the output of the last stage or a ``StageFailure``.
+    """
+    if not stages:
+        raise ValueError("Pipeline needs at least one stage")
+
+    queues: t.List[queue.Queue] = [
+        queue.Queue(maxsize=stage.queue_size or queue_size) for stage in stages
+    ]
+    queues.append(queue.Queue())
+
+    workers = []
+    for stage_index, stage in enumerate(stages):
+        if stage.workers < 1:
+            raise ValueError(f"Stage '{stage.name}' needs at least 1 worker")
+        stage_workers = [
+            threading.Thread(
+                target=_run_stage_worker,
+                args=(stage, queues[stage_index], queues[stage_index + 1]),
+                name=f"{stage.name}-{worker_index}",
+                daemon=True,
+            )
+            for worker_index in range(stage.workers)
+        ]
+        for worker in stage_workers:
+            worker.start()
+        workers.append(stage_workers)
+
+    supervisor = threading.Thread(
+        target=_supervise,
+        args=(items, stages, queues, workers),
+        name="pipeline-supervisor",
+        daemon=True,
+    )
+    supervisor.start()
+
+    pending: t.Dict[int, t.Tuple[t.Any, t.Any]] = {}
+    next_index = 0
+    while True:
+        message = queues[-1].get()
+        if message is _DONE:
+            break
+        index, item, value = message
+        pending[index] = (item, value)
+        while next_index in pending:
+            yield pending.pop(next_index)
+            next_index += 1
+
+    supervisor.join()
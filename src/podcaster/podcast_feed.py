@@ -0,0 +1,256 @@
+import gzip
+import hashlib
+import typing as t
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from xml.sax.saxutils import quoteattr
+
+from feedgen.entry import FeedEntry
+from feedgen.feed import FeedGenerator
+from loguru import logger
+from lxml import etree
+
+from podcaster.config import (
+    PODCAST_AUTHOR,
+    PODCAST_CATEGORIES,
+    PODCAST_DESCRIPTION,
+    PODCAST_FEED_ARCHIVE_CACHE_CONTROL,
+    PODCAST_FEED_ARCHIVE_DIR,
+    PODCAST_FEED_CACHE_CONTROL,
+    PODCAST_FEED_NAME,
+    PODCAST_FEED_PAGE_SIZE,
+    PODCAST_IMAGE,
+    PODCAST_NAME,
+    PODCAST_WEBSITE,
+    PUBLIC_BUCKET_URL,
+)
+from podcaster.parser import ParsedArticle
+from podcaster.state import FeedItem, StateStore
+
+try:
+    import brotli  # ty: ignore[unresolved-import]
+except ImportError:  # optional, feeds are then only precompressed with gzip
+    brotli = None
+
+_CHANNEL_END = b"</channel>"
+_FH_ARCHIVE = (
+    b'<fh:archive xmlns:fh="http://purl.org/syndication/history/1.0"/>'
+)
+_ENCODING_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+def _encode(body: bytes) -> t.List[t.Tuple[str, bytes]]:
+    # mtime=0 keeps gzip output byte-stable, so unchanged pages are skipped
+    encoded = [("gzip", gzip.compress(body, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoded.append(("br", brotli.compress(body)))
+    return encoded
+
+
+@dataclass
+class FeedDocument:
+    key: str
+    body: bytes
+    cache_control: str
+    page: int | None = None  # archive page number
+
+    def variants(self) -> t.Iterator[t.Tuple[str, bytes, str | None]]:
+        """Yield ``(key, body, content_encoding)`` for the plain document
+        and each precompressed copy of it."""
+        yield self.key, self.body, None
+        for encoding, body in _encode(self.body):
+            yield self.key + _ENCODING_SUFFIXES[encoding], body, encoding
+
+
+def archive_key(page: int) -> str:
+    return f"{PODCAST_FEED_ARCHIVE_DIR}page-{page}.xml"
+
+
+def _atom_link(rel: str, href: str) -> bytes:
+    return f"<atom:link rel={quoteattr(rel)} href={quoteattr(href)}/>".encode()
+
+
+def _feed_generator() -> FeedGenerator:
+    fg = FeedGenerator()
+    fg.load_extension("podcast")
+
+    fg.podcast.itunes_category(PODCAST_CATEGORIES)  # ty: ignore[unresolved-attribute]
+    fg.title(PODCAST_NAME)
+    fg.description(PODCAST_DESCRIPTION)
+    fg.link(href=PODCAST_WEBSITE)
+    fg.logo(PODCAST_IMAGE)
+    fg.author(PODCAST_AUTHOR)
+    fg.podcast.itunes_author(PODCAST_AUTHOR.get("name"))  # ty: ignore[unresolved-attribute]
+    fg.podcast.itunes_explicit("no")  # ty: ignore[unresolved-attribute]
+    fg.podcast.itunes_image(PODCAST_IMAGE)  # ty: ignore[unresolved-attribute]
+    fg.podcast.itunes_owner(  # ty: ignore[unresolved-attribute]
+        name=PODCAST_AUTHOR.get("name"), email=PODCAST_AUTHOR.get("email")
+    )
+    fg.podcast.itunes_summary(PODCAST_DESCRIPTION)  # ty: ignore[unresolved-attribute]
+    return fg
+
+
+def _item_key(article: ParsedArticle, url: str) -> str:
+    return hashlib.sha256(
+        "\0".join(
+            (
+                url,
+                article.podcast_title,
+                article.link,
+                article.podcast_description,
+                article.date.isoformat(),
+            )
+        ).encode()
+    ).hexdigest()
+
+
+def _render_item(article: ParsedArticle, url: str) -> bytes:
+    fe = FeedEntry()
+    fe.id(url)
+    fe.title(article.podcast_title)
+    fe.link(href=article.link)
+    fe.content(article.podcast_description, type="CDATA")
+    fe.enclosure(url, 0, "audio/mpeg")
+    fe.published(article.date)
+    return etree.tostring(fe.rss_entry())
+
+
+class PodcastFeedRenderer:
+    """Render the podcast RSS feed, reusing each episode's ``<item>`` XML.
+
+    Items are cached by a hash of everything that goes into them, so after
+    the first render only new or changed episodes go through feedgen; the
+    rest of the feed is spliced together from cached bytes. Episode and
+    archive URLs point below ``base_url``.
+    """
+
+    def __init__(self, base_url: str = PUBLIC_BUCKET_URL):
+        self.base_url = base_url
+        self._items: t.Dict[str, t.Tuple[str, bytes]] = {}
+
+    def _item(self, article: ParsedArticle) -> bytes:
+        url = f"{self.base_url}/{article.episode_key}"
+        key = _item_key(article, url)
+        cached = self._items.get(article.id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        item = _render_item(article, url)
+        self._items[article.id] = (key, item)
+        return item
+
+    def _document(
+        self,
+        items: t.Iterable[bytes],
+        extra: bytes = b"",
+        last_build_date: datetime | None = None,
+    ) -> bytes:
+        fg = _feed_generator()
+        if last_build_date is not None:
+            fg.lastBuildDate(last_build_date)
+        # Otherwise the channel has a fresh lastBuildDate on every render
+        head, end, tail = fg.rss_str().rpartition(_CHANNEL_END)
+        return b"".join((head, extra, *items, end, tail))
+
+    def _prune(self, articles: t.List[ParsedArticle]):
+        live_ids = {article.id for article in articles}
+        for article_id in self._items.keys() - live_ids:
+            del self._items[article_id]
+
+    def render(self, articles: t.List[ParsedArticle]) -> bytes:
+        # Newest episode first, as feedgen orders entries
+        document = self._document(
+            self._item(article) for article in reversed(articles)
+        )
+        self._prune(articles)
+        return document
+
+    def _archive_pages(self, catalog: StateStore, page_size: int):
+        current = _atom_link("current", f"{self.base_url}/{PODCAST_FEED_NAME}")
+        unarchived = catalog.unarchived_feed_items()
+        page = catalog.last_feed_page()
+        while len(unarchived) >= page_size:
+            items, unarchived = unarchived[:page_size], unarchived[page_size:]
+            page += 1
+            links = current
+            if page > 1:
+                links += _atom_link(
+                    "prev-archive",
+                    f"{self.base_url}/{archive_key(page - 1)}",
+                )
+            body = self._document(
+                (item.item for item in reversed(items)),
+                extra=_FH_ARCHIVE + links,
+                last_build_date=datetime.fromisoformat(items[-1].date),
+            )
+            catalog.add_feed_page(page, body, [item.id for item in items])
+            logger.info(f"Archived {len(items)} episodes as feed page {page}")
+
+    def render_paged(
+        self,
+        articles: t.List[ParsedArticle],
+        catalog: StateStore,
+        page_size: int = PODCAST_FEED_PAGE_SIZE,
+    ) -> t.List[FeedDocument]:
+        """Render a bounded current feed plus RFC 5005 archive pages.
+
+        ``articles`` are added to the ``catalog`` of every episode ever
+        published. Once ``page_size`` episodes are on no archive page, the
+        oldest of them are frozen into the next page, which is stored in
+        the catalog and never rendered again. Only pages not uploaded yet
+        are returned. The current feed always holds the newest
+        ``page_size`` episodes, for clients that ignore archives, and links
+        back to the newest archive page.
+        """
+        catalog.save_feed_items(
+            FeedItem(
+                id=article.id,
+                date=article.date.astimezone(timezone.utc).isoformat(),
+                item=self._item(article),
+            )
+            for article in articles
+        )
+        self._prune(articles)
+        self._archive_pages(catalog, page_size)
+
+        documents = [
+            FeedDocument(
+                key=archive_key(page),
+                body=body,
+                cache_control=PODCAST_FEED_ARCHIVE_CACHE_CONTROL,
+                page=page,
+            )
+            for page, body in catalog.pending_feed_pages()
+        ]
+
+        current_url = f"{self.base_url}/{PODCAST_FEED_NAME}"
+        links = _atom_link("self", current_url) + _atom_link(
+            "current", current_url
+        )
+        if last_page := catalog.last_feed_page():
+            links += _atom_link(
+                "prev-archive", f"{self.base_url}/{archive_key(last_page)}"
+            )
+        documents.append(
+            FeedDocument(
+                key=PODCAST_FEED_NAME,
+                body=self._document(
+                    (
+                        item.item
+                        for item in catalog.newest_feed_items(page_size)
+                    ),
+                    extra=links,
+                ),
+                cache_control=PODCAST_FEED_CACHE_CONTROL,
+            )
+        )
+        return documents
+
+
+def generate_podcast_feed_from(
+    articles: t.List[ParsedArticle], podcast_feed_name: str = PODCAST_FEED_NAME
+):
+    with open(podcast_feed_name, "wb") as f:
+        f.write(PodcastFeedRenderer().render(articles))
+    logger.success(f"Generated podcast feed with {len(articles)} articles")
+
+    return podcast_feed_name
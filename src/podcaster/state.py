@@ -0,0 +1,319 @@
+import sqlite3
+import threading
+import typing as t
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from loguru import logger
+
+from podcaster.config import BUCKET_NAME, STATE_DB_PATH, STATE_DIR
+from podcaster.fetch import FeedResponse
+from podcaster.parser import ParsedArticle
+
+STATUS_PENDING = "pending"
+STATUS_PUBLISHED = "published"
+STATUS_FAILED = "failed"
+META_LAST_RECONCILED_AT = "last_reconciled_at"
+META_FEED_ETAG = "feed_etag"
+META_FEED_LAST_MODIFIED = "feed_last_modified"
+META_FEED_BODY_HASH = "feed_body_hash"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    content_hash TEXT,
+    object_key TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    published_at TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS feed_items (
+    id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    item BLOB NOT NULL,
+    page INTEGER
+);
+CREATE TABLE IF NOT EXISTS feed_pages (
+    page INTEGER PRIMARY KEY,
+    body BLOB NOT NULL,
+    created_at TEXT NOT NULL,
+    uploaded_at TEXT
+);
+"""
+
+
+def state_db_path_for(backend: str, bucket_name: str = BUCKET_NAME) -> str:
+    """Where the state of one publishing target lives.
+
+    Targets never share a database: a run against one must not mark
+    articles, archive pages or feed validators as done for another.
+    """
+    if backend == "s3" and bucket_name == BUCKET_NAME:
+        return STATE_DB_PATH
+    if backend == "s3":
+        return f"{STATE_DIR}state-s3-{bucket_name}.db"
+    return f"{STATE_DIR}state-{backend}.db"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class ArticleState:
+    id: str
+    status: str
+    content_hash: str | None
+    object_key: str | None
+    created_at: str
+    updated_at: str
+    published_at: str | None
+
+
+@dataclass
+class FeedItem:
+    """A rendered ``<item>`` of the podcast feed, kept for archive pages."""
+
+    id: str
+    date: str  # ISO 8601 in UTC, so it sorts as text
+    item: bytes
+    page: int | None = None
+
+
+class StateStore:
+    def __init__(self, db_path: str = STATE_DB_PATH):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self.conn:
+            self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def get_meta(self, key: str) -> str | None:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    def delete_meta(self, key: str):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+
+    def get_feed_validators(self) -> t.Dict[str, str | None]:
+        return {
+            "etag": self.get_meta(META_FEED_ETAG),
+            "last_modified": self.get_meta(META_FEED_LAST_MODIFIED),
+            "previous_hash": self.get_meta(META_FEED_BODY_HASH),
+        }
+
+    def save_feed_validators(self, feed: FeedResponse):
+        for key, value in (
+            (META_FEED_ETAG, feed.etag),
+            (META_FEED_LAST_MODIFIED, feed.last_modified),
+            (META_FEED_BODY_HASH, feed.body_hash),
+        ):
+            if value is None:
+                self.delete_meta(key)
+            else:
+                self.set_meta(key, value)
+
+    def get(self, article_id: str) -> ArticleState | None:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT id, status, content_hash, object_key, created_at, "
+                "updated_at, published_at FROM articles WHERE id = ?",
+                (article_id,),
+            ).fetchone()
+        return ArticleState(*row) if row else None
+
+    def published_ids(self) -> t.Set[str]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id FROM articles WHERE status = ?",
+                (STATUS_PUBLISHED,),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def mark(
+        self,
+        article: ParsedArticle,
+        status: str,
+        object_key: str | None = None,
+    ):
+        now = _now()
+        published_at = now if status == STATUS_PUBLISHED else None
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO articles (id, status, content_hash, object_key, "
+                "created_at, updated_at, published_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET "
+                "status = excluded.status, "
+                "content_hash = excluded.content_hash, "
+                "object_key = COALESCE(excluded.object_key, object_key), "
+                "updated_at = excluded.updated_at, "
+                "published_at = COALESCE(excluded.published_at, published_at)",
+                (
+                    article.id,
+                    status,
+                    article.content_hash,
+                    object_key,
+                    now,
+                    now,
+                    published_at,
+                ),
+            )
+
+    def get_unpublished(
+        self, articles: t.List[ParsedArticle]
+    ) -> t.List[ParsedArticle]:
+        published = self.published_ids()
+        return [a for a in articles if a.id not in published]
+
+    def save_feed_items(self, items: t.Iterable[FeedItem]):
+        """Add or update rendered feed items, keeping their archive page."""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO feed_items (id, date, item) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET "
+                "date = excluded.date, item = excluded.item",
+                [(item.id, item.date, item.item) for item in items],
+            )
+
+    def feed_item_ids(self) -> t.Set[str]:
+        with self._lock:
+            rows = self.conn.execute("SELECT id FROM feed_items").fetchall()
+        return {row[0] for row in rows}
+
+    def newest_feed_items(self, limit: int) -> t.List[FeedItem]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, date, item, page FROM feed_items "
+                "ORDER BY date DESC, id LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [FeedItem(*row) for row in rows]
+
+    def unarchived_feed_items(self) -> t.List[FeedItem]:
+        """Feed items not on an archive page yet, oldest first."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, date, item, page FROM feed_items "
+                "WHERE page IS NULL ORDER BY date, id"
+            ).fetchall()
+        return [FeedItem(*row) for row in rows]
+
+    def last_feed_page(self) -> int:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MAX(page) FROM feed_pages"
+            ).fetchone()
+        return row[0] or 0
+
+    def add_feed_page(self, page: int, body: bytes, item_ids: t.List[str]):
+        """Freeze an archive page; its body and items never change again."""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO feed_pages (page, body, created_at) "
+                "VALUES (?, ?, ?)",
+                (page, body, _now()),
+            )
+            self.conn.executemany(
+                "UPDATE feed_items SET page = ? WHERE id = ?",
+                [(page, item_id) for item_id in item_ids],
+            )
+
+    def pending_feed_pages(self) -> t.List[t.Tuple[int, bytes]]:
+        """Archive pages that have not been uploaded yet."""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT page, body FROM feed_pages "
+                "WHERE uploaded_at IS NULL ORDER BY page"
+            ).fetchall()
+
+    def mark_feed_page_uploaded(self, page: int):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE feed_pages SET uploaded_at = ? WHERE page = ?",
+                (_now(), page),
+            )
+
+    def needs_reconcile(self, interval: timedelta) -> bool:
+        last_reconciled_at = self.get_meta(META_LAST_RECONCILED_AT)
+        if last_reconciled_at is None:
+            return True
+        last = datetime.fromisoformat(last_reconciled_at)
+        return datetime.now(timezone.utc) - last >= interval
+
+    def reconcile(self, remote_keys: t.Dict[str, str], force: bool = False):
+        """Make the published set match ``remote_keys`` (id -> object key).
+
+        An empty ``remote_keys`` would send every published article back to
+        pending, so it is refused unless ``force`` is set.
+        """
+        now = _now()
+        with self._lock, self.conn:
+            local = {
+                row[0]
+                for row in self.conn.execute(
+                    "SELECT id FROM articles WHERE status = ?",
+                    (STATUS_PUBLISHED,),
+                )
+            }
+            if local and not remote_keys and not force:
+                raise RuntimeError(
+                    f"Storage lists no episodes but {len(local)} articles "
+                    "are published locally, refusing to mark them all "
+                    "pending; pass --force to do it anyway"
+                )
+            missing = local - remote_keys.keys()
+            if missing:
+                logger.warning(
+                    f"Demoting {len(missing)} published articles missing "
+                    "from storage back to pending"
+                )
+            self.conn.executemany(
+                "UPDATE articles SET status = ?, updated_at = ? WHERE id = ?",
+                [(STATUS_PENDING, now, article_id) for article_id in missing],
+            )
+            self.conn.executemany(
+                "INSERT INTO articles (id, status, object_key, created_at, "
+                "updated_at, published_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET "
+                "status = excluded.status, "
+                "object_key = excluded.object_key, "
+                "updated_at = excluded.updated_at, "
+                "published_at = COALESCE(published_at, excluded.published_at)",
+                [
+                    (article_id, STATUS_PUBLISHED, key, now, now, now)
+                    for article_id, key in remote_keys.items()
+                    if article_id not in local
+                ],
+            )
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (META_LAST_RECONCILED_AT, now),
+            )
+        logger.info(
+            f"Reconciled state with storage: {len(remote_keys)} published, "
+            f"{len(missing)} missing from storage"
+        )
@@ -1,66 +1,889 @@
+import fcntl
+import functools
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+import time
 import typing as t
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from pathlib import Path
 
 import boto3
-from botocore.exceptions import NoCredentialsError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError, NoCredentialsError
 from loguru import logger
 
-from podcaster.config import BUCKET_URL
+from podcaster.config import (
+    BUCKET_MANIFEST_KEY,
+    BUCKET_MANIFEST_MAX_ATTEMPTS,
+    BUCKET_NAME,
+    BUCKET_URL,
+    DELETE_BATCH_SIZE,
+    LOCAL_PUBLIC_URL,
+    LOCAL_STORAGE_DIR,
+    PUBLIC_BUCKET_URL,
+    RESULTS_DIR,
+    STORAGE_BACKEND,
+    UPLOAD_MAX_CONCURRENCY,
+    UPLOAD_MAX_POOL_CONNECTIONS,
+    UPLOAD_MAX_WORKERS,
+    UPLOAD_MULTIPART_CHUNKSIZE_MB,
+    UPLOAD_MULTIPART_THRESHOLD_MB,
+)
 from podcaster.parser import ParsedArticle
 
+MANIFEST_VERSION = 1
+_PRECONDITION_ERRORS = {"PreconditionFailed", "ConditionalRequestConflict"}
 
-class S3BucketManager:
-    def __init__(self, bucket_name: str, region_name: str = "auto"):
-        self.bucket_name = bucket_name
-        self.s3 = boto3.client(
-            service_name="s3",
-            endpoint_url=BUCKET_URL,
-            region_name=region_name,
+
+class StorageError(Exception):
+    pass
+
+
+class PreconditionFailed(StorageError):
+    pass
+
+
+@dataclass
+class Manifest:
+    objects: t.Dict[str, t.Dict[str, t.Any]] = field(default_factory=dict)
+    etag: str | None = None
+
+    @property
+    def exists(self) -> bool:
+        return self.etag is not None
+
+    def transcribed_keys(self) -> t.Dict[str, str]:
+        return {
+            Path(key).stem: key
+            for key in self.objects
+            if key.startswith(RESULTS_DIR) and key.endswith(".mp3")
+        }
+
+
+@dataclass
+class BytesUpload:
+    data: bytes
+    key: str
+    content_type: str | None = None
+    cache_control: str | None = None
+    content_encoding: str | None = None
+
+
+@dataclass
+class UploadResult:
+    key: str
+    size: int = 0
+    seconds: float = 0.0
+    etag: str | None = None
+    skipped: bool = False
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class GarbagePlan:
+    orphans: t.List[str]
+    orphan_bytes: int
+    dangling: t.List[str]
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.orphans and not self.dangling
+
+
+class UploadWriter(io.RawIOBase):
+    """A file whose bytes become an object once ``commit`` is called."""
+
+    size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    @abstractmethod
+    def commit(self) -> str:
+        """Publish what was written and return its ETag."""
+
+    @abstractmethod
+    def abort(self):
+        """Discard what was written."""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _content_type_for(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+def _md5_of(fileobj: t.BinaryIO) -> str:
+    digest = hashlib.md5()
+    while data := fileobj.read(1024 * 1024):
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class StorageBackend(ABC):
+    """Where the publishing pipeline puts episodes and the feed.
+
+    Manifest, upload and GC logic live here; subclasses provide the object
+    primitives: listing, reading, a compare-and-swap write for the
+    manifest, uploads and batch deletes. ``public_url`` is where listeners
+    fetch the published keys from.
+    """
+
+    manifest_key: str
+    public_url: str
+
+    def __init__(
+        self, public_url: str, manifest_key: str = BUCKET_MANIFEST_KEY
+    ):
+        self.public_url = public_url.rstrip("/")
+        self.manifest_key = manifest_key
+        self._manifest_lock = threading.Lock()
+        self._manifest: Manifest | None = None
+
+    @abstractmethod
+    def list_objects(
+        self, prefix: str = ""
+    ) -> t.Dict[str, t.Dict[str, t.Any]]: ...
+
+    @abstractmethod
+    def _get_object(self, key: str) -> t.Tuple[bytes, str] | None: ...
+
+    @abstractmethod
+    def _put_manifest(self, body: bytes, if_match: str | None) -> str: ...
+
+    @abstractmethod
+    def _head_etag(self, key: str) -> str | None: ...
+
+    @abstractmethod
+    def _upload_fileobj(
+        self,
+        fileobj: t.BinaryIO,
+        key: str,
+        content_type: str,
+        cache_control: str | None = None,
+        content_encoding: str | None = None,
+    ): ...
+
+    @abstractmethod
+    def _open_writer(self, key: str, content_type: str) -> UploadWriter: ...
+
+    @abstractmethod
+    def _delete_objects(self, keys: t.List[str]) -> t.Set[str]: ...
+
+    def etag_for(self, fileobj: t.BinaryIO, size: int) -> str:
+        return _md5_of(fileobj)
+
+    def list_bucket_contents(self, prefix: str = "") -> t.List[str]:
+        return list(self.list_objects(prefix=prefix))
+
+    def load_manifest(self) -> Manifest:
+        found = self._get_object(self.manifest_key)
+        if found is None:
+            return Manifest()
+        body, etag = found
+        self._manifest = Manifest(
+            objects=json.loads(body)["objects"], etag=etag
+        )
+        return self._manifest
+
+    def get_manifest(self) -> Manifest:
+        manifest = self.load_manifest()
+        if not manifest.exists:
+            logger.warning("No bucket manifest found, rebuilding it")
+            return self.reconcile_manifest()
+        return manifest
+
+    def update_manifest(
+        self,
+        upserts: t.Dict[str, t.Dict[str, t.Any]] | None = None,
+        removals: t.Iterable[str] = (),
+        prefix: str | None = None,
+    ) -> Manifest:
+        """Apply changes with a compare-and-swap on the manifest ETag.
+
+        If ``prefix`` is given, every entry under it that is not in
+        ``upserts`` is dropped, so the prefix is replaced as a whole.
+        """
+        upserts = upserts or {}
+        removals = set(removals)
+        with self._manifest_lock:
+            for _ in range(BUCKET_MANIFEST_MAX_ATTEMPTS):
+                manifest = self.load_manifest()
+                objects = {
+                    key: entry
+                    for key, entry in manifest.objects.items()
+                    if key not in removals
+                    and (prefix is None or not key.startswith(prefix))
+                }
+                objects.update(upserts)
+                body = json.dumps(
+                    {
+                        "version": MANIFEST_VERSION,
+                        "updated_at": _now(),
+                        "objects": objects,
+                    }
+                ).encode()
+                try:
+                    etag = self._put_manifest(body, if_match=manifest.etag)
+                except PreconditionFailed:
+                    logger.info("Manifest changed concurrently, retrying")
+                    continue
+                self._manifest = Manifest(objects=objects, etag=etag)
+                return self._manifest
+        raise RuntimeError(
+            f"Could not update {self.manifest_key} after "
+            f"{BUCKET_MANIFEST_MAX_ATTEMPTS} attempts"
+        )
+
+    def reconcile_manifest(self, prefix: str = RESULTS_DIR) -> Manifest:
+        """Replace the manifest entries under ``prefix`` with a full listing.
+
+        Raises ``StorageError`` if the listing fails, leaving the manifest
+        untouched.
+        """
+        listed = {
+            key: entry
+            for key, entry in self.list_objects(prefix=prefix).items()
+            if key != self.manifest_key
+        }
+        manifest = self.update_manifest(upserts=listed, prefix=prefix)
+        logger.info(
+            f"Reconciled manifest with {len(listed)} objects under '{prefix}'"
+        )
+        return manifest
+
+    def remote_etag(self, key: str) -> str | None:
+        manifest = self._manifest or self.load_manifest()
+        etag = manifest.objects.get(key, {}).get("etag")
+        if etag:
+            return etag
+        return self._head_etag(key)
+
+    def _upload(
+        self,
+        open_fileobj: t.Callable[[], t.BinaryIO],
+        size: int,
+        key: str,
+        content_type: str | None,
+        skip_unchanged: bool,
+        cache_control: str | None = None,
+        content_encoding: str | None = None,
+    ) -> UploadResult:
+        start = time.perf_counter()
+        with open_fileobj() as fileobj:
+            etag = self.etag_for(fileobj, size)
+            if skip_unchanged and self.remote_etag(key) == etag:
+                return UploadResult(
+                    key=key,
+                    size=size,
+                    seconds=time.perf_counter() - start,
+                    etag=etag,
+                    skipped=True,
+                )
+            fileobj.seek(0)
+            self._upload_fileobj(
+                fileobj,
+                key,
+                content_type or _content_type_for(key),
+                cache_control=cache_control,
+                content_encoding=content_encoding,
+            )
+        return UploadResult(
+            key=key, size=size, seconds=time.perf_counter() - start, etag=etag
         )
 
-    def list_bucket_contents(self) -> t.List[str]:
+    def _upload_file(
+        self, local_file_path: str, key: str, skip_unchanged: bool
+    ) -> UploadResult:
         try:
-            response = self.s3.list_objects_v2(Bucket=self.bucket_name)
-            return [item["Key"] for item in response.get("Contents", [])]
-        except NoCredentialsError:
-            print("Credentials not available")
-            return []
-
-    def upload_files(self, files: t.List[t.Tuple[str, str]]) -> t.List[str]:
-        uploaded_files = []
-        for local_file_path, s3_file_name in files:
-            try:
-                self.s3.upload_file(
-                    local_file_path, self.bucket_name, s3_file_name
+            return self._upload(
+                open_fileobj=lambda: open(local_file_path, "rb"),
+                size=os.path.getsize(local_file_path),
+                key=key,
+                content_type=None,
+                skip_unchanged=skip_unchanged,
+            )
+        except FileNotFoundError:
+            return UploadResult(
+                key=key, error=f"The file {local_file_path} was not found"
+            )
+        except StorageError as e:
+            return UploadResult(key=key, error=str(e))
+
+    def _record_uploads(self, results: t.List[UploadResult]):
+        for result in results:
+            if not result.ok:
+                logger.error(f"Failed to upload {result.key}: {result.error}")
+            elif result.skipped:
+                logger.info(f"Skipped {result.key}, unchanged in cloud")
+            else:
+                logger.info(
+                    f"Uploaded {result.key} ({result.size / 1e6:.1f} MB) "
+                    f"in {result.seconds:.2f}s"
                 )
-                uploaded_files.append(s3_file_name)
-            except FileNotFoundError:
-                print(f"The file {local_file_path} was not found")
-            except NoCredentialsError:
-                print("Credentials not available")
-            logger.info(f"Uploaded {local_file_path} to cloud.")
-        return uploaded_files
-
-    def delete_files(self, file_names: t.List[str]) -> t.List[str]:
+        sent = sum(r.size for r in results if r.ok and not r.skipped)
+        skipped = sum(r.size for r in results if r.skipped)
+        logger.info(f"Sent {sent} bytes, skipped {skipped} unchanged bytes")
+
+        upserts = {
+            result.key: {
+                "size": result.size,
+                "etag": result.etag,
+                "updated_at": _now(),
+            }
+            for result in results
+            if result.ok and not result.skipped
+        }
+        if upserts:
+            self.update_manifest(upserts=upserts)
+
+    def upload_files(
+        self,
+        files: t.List[t.Tuple[str, str]],
+        max_workers: int = UPLOAD_MAX_WORKERS,
+        skip_unchanged: bool = True,
+    ) -> t.List[UploadResult]:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(
+                executor.map(
+                    lambda file: self._upload_file(
+                        *file, skip_unchanged=skip_unchanged
+                    ),
+                    files,
+                )
+            )
+        self._record_uploads(results)
+        return results
+
+    def _upload_bytes(
+        self, upload: BytesUpload, skip_unchanged: bool
+    ) -> UploadResult:
+        try:
+            return self._upload(
+                open_fileobj=lambda: io.BytesIO(upload.data),
+                size=len(upload.data),
+                key=upload.key,
+                content_type=upload.content_type,
+                skip_unchanged=skip_unchanged,
+                cache_control=upload.cache_control,
+                content_encoding=upload.content_encoding,
+            )
+        except StorageError as e:
+            return UploadResult(key=upload.key, error=str(e))
+
+    def upload_many_bytes(
+        self,
+        uploads: t.List[BytesUpload],
+        max_workers: int = UPLOAD_MAX_WORKERS,
+        skip_unchanged: bool = True,
+    ) -> t.List[UploadResult]:
+        """Upload every blob, then record them all in one manifest update."""
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(
+                executor.map(
+                    lambda upload: self._upload_bytes(
+                        upload, skip_unchanged=skip_unchanged
+                    ),
+                    uploads,
+                )
+            )
+        self._record_uploads(results)
+        return results
+
+    def upload_bytes(
+        self,
+        data: bytes,
+        key: str,
+        content_type: str | None = None,
+        skip_unchanged: bool = True,
+        cache_control: str | None = None,
+        content_encoding: str | None = None,
+    ) -> UploadResult:
+        result = self._upload_bytes(
+            BytesUpload(
+                data=data,
+                key=key,
+                content_type=content_type,
+                cache_control=cache_control,
+                content_encoding=content_encoding,
+            ),
+            skip_unchanged=skip_unchanged,
+        )
+        self._record_uploads([result])
+        return result
+
+    @contextmanager
+    def open_upload(
+        self, key: str, content_type: str | None = None
+    ) -> t.Generator[UploadWriter, None, None]:
+        """Upload everything written to the yielded file as ``key``.
+
+        The object only appears once the block exits cleanly; if it
+        raises, the partial upload is discarded.
+        """
+        start = time.perf_counter()
+        writer = self._open_writer(key, content_type or _content_type_for(key))
+        try:
+            yield writer
+            etag = writer.commit()
+        except BaseException:
+            writer.abort()
+            raise
+        self._record_uploads(
+            [
+                UploadResult(
+                    key=key,
+                    size=writer.size,
+                    seconds=time.perf_counter() - start,
+                    etag=etag,
+                )
+            ]
+        )
+
+    def delete_files(
+        self, file_names: t.List[str], removals: t.Iterable[str] = ()
+    ) -> t.List[str]:
         deleted_files = []
-        for file_name in file_names:
+        for batch_start in range(0, len(file_names), DELETE_BATCH_SIZE):
+            batch = file_names[batch_start : batch_start + DELETE_BATCH_SIZE]
             try:
-                self.s3.delete_object(Bucket=self.bucket_name, Key=file_name)
-                deleted_files.append(file_name)
-            except NoCredentialsError:
-                print("Credentials not available")
+                failed = self._delete_objects(batch)
+            except StorageError as e:
+                logger.error(f"Failed to delete objects: {e}")
+                break
+            deleted_files.extend(key for key in batch if key not in failed)
+        removals = [*deleted_files, *removals]
+        if removals:
+            self.update_manifest(removals=removals)
         return deleted_files
 
+    def plan_garbage_collection(
+        self, keep_keys: t.Set[str], prefix: str = RESULTS_DIR
+    ) -> GarbagePlan:
+        listed = self.list_objects(prefix=prefix)
+        manifest = self.load_manifest()
+        orphans = sorted(
+            key
+            for key in listed
+            if key not in keep_keys and key != self.manifest_key
+        )
+        dangling = sorted(
+            key
+            for key in manifest.objects
+            if key.startswith(prefix) and key not in listed
+        )
+        return GarbagePlan(
+            orphans=orphans,
+            orphan_bytes=sum(listed[key]["size"] for key in orphans),
+            dangling=dangling,
+        )
+
+    def collect_garbage(self, plan: GarbagePlan) -> t.List[str]:
+        deleted = self.delete_files(plan.orphans, removals=plan.dangling)
+        logger.info(
+            f"Deleted {len(deleted)} orphaned objects and dropped "
+            f"{len(plan.dangling)} dangling manifest entries"
+        )
+        return deleted
+
+    def get_transcribed_keys(self) -> t.Dict[str, str]:
+        return self.get_manifest().transcribed_keys()
+
     def get_untranscribed(
         self, articles: t.List[ParsedArticle]
     ) -> t.List[ParsedArticle]:
-        bucket_contents = self.list_bucket_contents()
-        transcribed_ids = [Path(f).stem for f in bucket_contents]
+        transcribed_ids = self.get_transcribed_keys().keys()
         return [a for a in articles if a.id not in transcribed_ids]
 
     def get_transcribed(
         self, articles: t.List[ParsedArticle]
     ) -> t.List[ParsedArticle]:
-        bucket_contents = self.list_bucket_contents()
-        transcribed_ids = [Path(f).stem for f in bucket_contents]
+        transcribed_ids = self.get_transcribed_keys().keys()
         return [a for a in articles if a.id in transcribed_ids]
+
+
+@functools.lru_cache(maxsize=None)
+def get_s3_client(endpoint_url: str | None, region_name: str):
+    return boto3.client(
+        service_name="s3",
+        endpoint_url=endpoint_url,
+        region_name=region_name,
+        config=Config(
+            max_pool_connections=UPLOAD_MAX_POOL_CONNECTIONS,
+            tcp_keepalive=True,
+        ),
+    )
+
+
+class _S3StreamWriter(UploadWriter):
+    """Stream into S3, switching to a multipart upload once the data
+    outgrows a single part.
+
+    Parts have the TransferConfig chunk size, so the resulting ETag is the
+    one ``etag_for`` computes for the same bytes.
+    """
+
+    def __init__(
+        self,
+        s3,
+        bucket_name: str,
+        key: str,
+        content_type: str,
+        transfer_config: TransferConfig,
+    ):
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.key = key
+        self.content_type = content_type
+        self.threshold = transfer_config.multipart_threshold
+        self.part_size = transfer_config.multipart_chunksize
+        self._buffer = bytearray()
+        self._upload_id: str | None = None
+        self._parts: t.List[t.Dict[str, t.Any]] = []
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self.size += len(data)
+        # Hold back a full part so the last one is never empty
+        while len(self._buffer) > self.part_size:
+            self._upload_part(bytes(self._buffer[: self.part_size]))
+            del self._buffer[: self.part_size]
+        return len(data)
+
+    def _upload_part(self, body: bytes):
+        if self._upload_id is None:
+            self._upload_id = self.s3.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                ContentType=self.content_type,
+            )["UploadId"]
+        number = len(self._parts) + 1
+        response = self.s3.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=number,
+            Body=body,
+        )
+        self._parts.append({"PartNumber": number, "ETag": response["ETag"]})
+
+    def commit(self) -> str:
+        if self._upload_id is None and self.size < self.threshold:
+            response = self.s3.put_object(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                Body=bytes(self._buffer),
+                ContentType=self.content_type,
+            )
+        else:
+            self._upload_part(bytes(self._buffer))
+            response = self.s3.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts},
+            )
+        self._buffer.clear()
+        self.close()
+        return response["ETag"].strip('"')
+
+    def abort(self):
+        if self._upload_id is not None:
+            self.s3.abort_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                UploadId=self._upload_id,
+            )
+        self.close()
+
+
+class _LocalStreamWriter(UploadWriter):
+    """Stream into a temporary file that is moved into place on commit."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        self._file = os.fdopen(fd, "wb")
+        self._digest = hashlib.md5()
+
+    def write(self, data) -> int:
+        self._file.write(data)
+        self._digest.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def commit(self) -> str:
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        self.close()
+        return self._digest.hexdigest()
+
+    def abort(self):
+        self._file.close()
+        os.unlink(self._tmp_path)
+        self.close()
+
+
+class S3BucketManager(StorageBackend):
+    def __init__(
+        self,
+        bucket_name: str,
+        region_name: str = "auto",
+        manifest_key: str = BUCKET_MANIFEST_KEY,
+        public_url: str = PUBLIC_BUCKET_URL,
+    ):
+        super().__init__(public_url=public_url, manifest_key=manifest_key)
+        self.bucket_name = bucket_name
+        self.s3 = get_s3_client(BUCKET_URL, region_name)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=UPLOAD_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+            multipart_chunksize=UPLOAD_MULTIPART_CHUNKSIZE_MB * 1024 * 1024,
+            max_concurrency=UPLOAD_MAX_CONCURRENCY,
+        )
+
+    def list_objects(
+        self, prefix: str = ""
+    ) -> t.Dict[str, t.Dict[str, t.Any]]:
+        objects = {}
+        try:
+            paginator = self.s3.get_paginator("list_objects_v2")
+            for page in paginator.paginate(
+                Bucket=self.bucket_name, Prefix=prefix
+            ):
+                for item in page.get("Contents", []):
+                    objects[item["Key"]] = {
+                        "size": item["Size"],
+                        "etag": item["ETag"].strip('"'),
+                        "updated_at": item["LastModified"].isoformat(),
+                    }
+        except NoCredentialsError as e:
+            # An empty listing would read as "everything is gone"
+            raise StorageError("Credentials not available") from e
+        return objects
+
+    def _get_object(self, key: str) -> t.Tuple[bytes, str] | None:
+        try:
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+        return response["Body"].read(), response["ETag"]
+
+    def _put_manifest(self, body: bytes, if_match: str | None) -> str:
+        conditions = (
+            {"IfMatch": if_match} if if_match else {"IfNoneMatch": "*"}
+        )
+        try:
+            response = self.s3.put_object(
+                Bucket=self.bucket_name,
+                Key=self.manifest_key,
+                Body=body,
+                ContentType="application/json",
+                **conditions,
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] in _PRECONDITION_ERRORS:
+                raise PreconditionFailed(self.manifest_key) from e
+            raise
+        return response["ETag"]
+
+    def _head_etag(self, key: str) -> str | None:
+        try:
+            response = self.s3.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+        return response["ETag"].strip('"')
+
+    def _upload_fileobj(
+        self,
+        fileobj: t.BinaryIO,
+        key: str,
+        content_type: str,
+        cache_control: str | None = None,
+        content_encoding: str | None = None,
+    ):
+        extra_args = {"ContentType": content_type}
+        if cache_control:
+            extra_args["CacheControl"] = cache_control
+        if content_encoding:
+            extra_args["ContentEncoding"] = content_encoding
+        try:
+            self.s3.upload_fileobj(
+                fileobj,
+                self.bucket_name,
+                key,
+                ExtraArgs=extra_args,
+                Config=self.transfer_config,
+            )
+        except NoCredentialsError as e:
+            raise StorageError("Credentials not available") from e
+
+    def _delete_objects(self, keys: t.List[str]) -> t.Set[str]:
+        try:
+            response = self.s3.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={
+                    "Objects": [{"Key": key} for key in keys],
+                    "Quiet": True,
+                },
+            )
+        except NoCredentialsError as e:
+            raise StorageError("Credentials not available") from e
+        for error in response.get("Errors", []):
+            logger.error(
+                f"Failed to delete {error['Key']}: {error.get('Message')}"
+            )
+        return {error["Key"] for error in response.get("Errors", [])}
+
+    def _open_writer(self, key: str, content_type: str) -> UploadWriter:
+        return _S3StreamWriter(
+            self.s3,
+            self.bucket_name,
+            key,
+            content_type,
+            self.transfer_config,
+        )
+
+    def etag_for(self, fileobj: t.BinaryIO, size: int) -> str:
+        """Compute the ETag S3 assigns to these bytes with our TransferConfig."""
+        if size < self.transfer_config.multipart_threshold:
+            return _md5_of(fileobj)
+
+        part_digests = []
+        while data := fileobj.read(self.transfer_config.multipart_chunksize):
+            part_digests.append(hashlib.md5(data).digest())
+        combined = hashlib.md5(b"".join(part_digests)).hexdigest()
+        return f"{combined}-{len(part_digests)}"
+
+
+class LocalStorageManager(StorageBackend):
+    """Publishes into a directory that any static web server can serve.
+
+    Every write lands in a temporary file next to its target and is moved
+    into place with ``os.replace``, so readers never see partial files.
+    """
+
+    def __init__(
+        self,
+        root_dir: str = LOCAL_STORAGE_DIR,
+        manifest_key: str = BUCKET_MANIFEST_KEY,
+        public_url: str = LOCAL_PUBLIC_URL,
+    ):
+        super().__init__(public_url=public_url, manifest_key=manifest_key)
+        self.root = Path(root_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock_path = self.root / ".manifest.lock"
+
+    def _path_for(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise StorageError(f"Key {key!r} escapes the storage root")
+        return path
+
+    def _write_atomically(self, fileobj: t.BinaryIO, key: str):
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                shutil.copyfileobj(fileobj, tmp)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def list_objects(
+        self, prefix: str = ""
+    ) -> t.Dict[str, t.Dict[str, t.Any]]:
+        objects = {}
+        for path in self.root.rglob("*"):
+            key = path.relative_to(self.root).as_posix()
+            if (
+                not path.is_file()
+                or not key.startswith(prefix)
+                or path.name.startswith(".")
+            ):
+                continue
+            stat = path.stat()
+            objects[key] = {
+                "size": stat.st_size,
+                "etag": None,
+                "updated_at": datetime.fromtimestamp(
+                    stat.st_mtime, tz=timezone.utc
+                ).isoformat(),
+            }
+        return objects
+
+    def _get_object(self, key: str) -> t.Tuple[bytes, str] | None:
+        try:
+            body = self._path_for(key).read_bytes()
+        except FileNotFoundError:
+            return None
+        return body, hashlib.md5(body).hexdigest()
+
+    def _put_manifest(self, body: bytes, if_match: str | None) -> str:
+        with open(self._lock_path, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            current = self._get_object(self.manifest_key)
+            current_etag = current[1] if current else None
+            if current_etag != if_match:
+                raise PreconditionFailed(self.manifest_key)
+            self._write_atomically(io.BytesIO(body), self.manifest_key)
+        return hashlib.md5(body).hexdigest()
+
+    def _head_etag(self, key: str) -> str | None:
+        try:
+            with open(self._path_for(key), "rb") as f:
+                return _md5_of(f)
+        except FileNotFoundError:
+            return None
+
+    def _upload_fileobj(
+        self,
+        fileobj: t.BinaryIO,
+        key: str,
+        content_type: str,
+        cache_control: str | None = None,
+        content_encoding: str | None = None,
+    ):
+        # Files carry no headers; whatever serves the directory sets them
+        self._write_atomically(fileobj, key)
+
+    def _open_writer(self, key: str, content_type: str) -> UploadWriter:
+        return _LocalStreamWriter(self._path_for(key))
+
+    def _delete_objects(self, keys: t.List[str]) -> t.Set[str]:
+        for key in keys:
+            self._path_for(key).unlink(missing_ok=True)
+        return set()
+
+
+def get_storage(
+    backend: str = STORAGE_BACKEND, bucket_name: str = BUCKET_NAME
+) -> StorageBackend:
+    if backend == "s3":
+        return S3BucketManager(bucket_name=bucket_name)
+    if backend == "local":
+        return LocalStorageManager()
+    raise ValueError(f"Unknown storage backend: {backend}")
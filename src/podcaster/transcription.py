@@ -1,21 +1,55 @@
 import io
 import re
+import threading
+import time
+import typing as t
+from contextlib import ExitStack, contextmanager
 
 import modal
 from loguru import logger
-from pydub import AudioSegment
 
+from podcaster.audio import CrossfadeWriter, Mp3Encoder
 from podcaster.config import (
+    AUDIO_KEEP_WAV,
+    LLM_PREPROCESSING_MODE,
     QWEN_TTS_BATCH_SIZE,
     QWEN_TTS_CROSSFADE_MS,
     QWEN_TTS_LANGUAGE,
+    QWEN_TTS_MAX_BATCH_CHARS,
     QWEN_TTS_MAX_CHARS_PER_CHUNK,
     QWEN_TTS_MAX_NEW_TOKENS,
     QWEN_TTS_SPEAKER,
     RESULTS_DIR,
 )
-from podcaster.modal_functions import app, transcribe_chunks
-from podcaster.parser import ParsedArticle
+from podcaster.modal_functions import TTSService, app
+from podcaster.parser import ParsedArticle, llm_stream_retry
+from podcaster.storage import StorageBackend
+
+_modal_session_lock = threading.Lock()
+_modal_session_users = 0
+_modal_session_stack: ExitStack | None = None
+
+
+@contextmanager
+def modal_session():
+    """Keep a single Modal app run open while any caller is inside it."""
+    global _modal_session_users, _modal_session_stack
+
+    with _modal_session_lock:
+        if _modal_session_users == 0:
+            stack = ExitStack()
+            stack.enter_context(modal.enable_output())
+            stack.enter_context(app.run())
+            _modal_session_stack = stack
+        _modal_session_users += 1
+    try:
+        yield
+    finally:
+        with _modal_session_lock:
+            _modal_session_users -= 1
+            if _modal_session_users == 0 and _modal_session_stack:
+                _modal_session_stack.close()
+                _modal_session_stack = None
 
 
 def split_text_into_chunks(
@@ -51,73 +85,252 @@ def split_text_into_chunks(
     return chunks
 
 
-def concatenate_wav_bytes(audio_bytes_list: list[bytes]) -> bytes:
-    from pydub import AudioSegment
+class StreamingChunker:
+    """Turn streamed text into TTS chunks as soon as they can't change.
 
-    combined = AudioSegment.from_wav(io.BytesIO(audio_bytes_list[0]))
-    for audio_bytes in audio_bytes_list[1:]:
-        segment = AudioSegment.from_wav(io.BytesIO(audio_bytes))
-        combined = combined.append(segment, crossfade=QWEN_TTS_CROSSFADE_MS)
+    Input pieces must end on sentence boundaries. Every chunk except the
+    last one of the pending text is final, so those are released early.
+    """
 
-    output = io.BytesIO()
-    combined.export(output, format="wav")
-    logger.info(f"Merged {len(audio_bytes_list)} chunks into output.wav")
-    return output.getvalue()
+    def __init__(self, max_chars: int = QWEN_TTS_MAX_CHARS_PER_CHUNK):
+        self.max_chars = max_chars
+        self.pending = ""
 
+    def add(self, text: str) -> list[str]:
+        self.pending += text
+        if len(self.pending) <= self.max_chars:
+            return []
+        *ready, last = split_text_into_chunks(
+            self.pending, max_chars=self.max_chars
+        )
+        self.pending = f"{last} "
+        return ready
 
-def text_to_bytes(text: str) -> bytes:
-    chunks = split_text_into_chunks(
-        text, max_chars=QWEN_TTS_MAX_CHARS_PER_CHUNK
-    )
-    generation_kwargs = {
+    def flush(self) -> list[str]:
+        pending, self.pending = self.pending, ""
+        if not pending.strip():
+            return []
+        return split_text_into_chunks(pending, max_chars=self.max_chars)
+
+
+def default_generation_kwargs() -> dict:
+    return {
         "speaker": QWEN_TTS_SPEAKER,
         "language": QWEN_TTS_LANGUAGE,
         "max_new_tokens": QWEN_TTS_MAX_NEW_TOKENS,
         "batch_size": QWEN_TTS_BATCH_SIZE,
+        "max_batch_chars": QWEN_TTS_MAX_BATCH_CHARS,
     }
+
+
+def synthesize(text: str) -> t.Iterator[bytes]:
+    """Yield the WAV audio of each TTS chunk of ``text``, in order, as soon
+    as Modal returns it."""
+    chunks = split_text_into_chunks(
+        text, max_chars=QWEN_TTS_MAX_CHARS_PER_CHUNK
+    )
     print(f"Text split into {len(chunks)} chunks.")
-    audio_bytes = None
-    with modal.enable_output():
-        with app.run():
-            audio_bytes = transcribe_chunks.remote(
-                chunks=chunks,
-                generation_kwargs=generation_kwargs,
-            )
-    if not audio_bytes:
-        raise ValueError("No results returned from transcription.")
+    start = time.perf_counter()
+    with modal_session():
+        yield from TTSService().synthesize.remote_gen(
+            chunks=chunks, generation_kwargs=default_generation_kwargs()
+        )
+    logger.info(
+        f"Synthesized {len(chunks)} chunks in "
+        f"{time.perf_counter() - start:.1f}s"
+    )
 
-    final_audio = concatenate_wav_bytes(audio_bytes)
-    return final_audio
 
+def synthesize_stream(pieces: t.Iterable[str]) -> t.Iterator[bytes]:
+    """Synthesize text while it is still being produced.
 
-def transcribe_to_file(
-    article: ParsedArticle,
-    target_dir: str = RESULTS_DIR,
+    ``pieces`` are read on a background thread. Chunks the chunker releases
+    while a TTS call is running are sent together in the next call, which
+    the service schedules in length-bucketed batches, so TTS overlaps with
+    whatever generates ``pieces`` without giving up batching. Audio is
+    yielded in order as soon as it is ready. Closing the generator closes
+    the running call and stops reading ``pieces`` at the next piece.
+    """
+    generation_kwargs = default_generation_kwargs()
+    chunker = StreamingChunker()
+    start = time.perf_counter()
+    text_done_at = []
+    first_audio_at = None
+    ready = threading.Condition()
+    pending: list[str] = []
+    errors: list[BaseException] = []
+    fed = threading.Event()
+    stop = threading.Event()
+
+    def release(chunks: list[str]):
+        if chunks:
+            with ready:
+                pending.extend(chunks)
+                ready.notify()
+
+    def feed():
+        try:
+            for piece in pieces:
+                if stop.is_set():
+                    break
+                release(chunker.add(piece))
+            else:
+                release(chunker.flush())
+                text_done_at.append(time.perf_counter())
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            if stop.is_set() and (close := getattr(pieces, "close", None)):
+                close()
+            with ready:
+                fed.set()
+                ready.notify()
+
+    feeder = threading.Thread(target=feed, name="tts-feed", daemon=True)
+    feeder.start()
+    count = calls = 0
+    try:
+        with modal_session():
+            service = TTSService()
+            while True:
+                with ready:
+                    ready.wait_for(lambda: pending or fed.is_set())
+                    if errors:
+                        raise errors[0]
+                    batch = pending[:]
+                    pending.clear()
+                if not batch:
+                    break
+                stream = service.synthesize.remote_gen(
+                    chunks=batch, generation_kwargs=generation_kwargs
+                )
+                calls += 1
+                try:
+                    for audio in stream:
+                        if first_audio_at is None:
+                            first_audio_at = time.perf_counter()
+                        yield audio
+                finally:
+                    if close := getattr(stream, "close", None):
+                        close()
+                count += len(batch)
+    finally:
+        # Not joined: the reader may be blocked on the next piece
+        stop.set()
+
+    if first_audio_at is not None:
+        logger.info(
+            f"Streamed {count} chunks in {calls} TTS calls: text done after "
+            f"{text_done_at[0] - start:.1f}s, first audio after "
+            f"{first_audio_at - start:.1f}s, all audio after "
+            f"{time.perf_counter() - start:.1f}s"
+        )
+
+
+def write_audio(
+    chunks: t.Iterable[bytes],
+    sink: t.BinaryIO | io.RawIOBase,
     as_mp3: bool = True,
-) -> str:
+    wav_file_name: str | None = None,
+):
+    """Crossfade audio ``chunks`` into ``sink`` as they arrive.
+
+    With ``as_mp3`` the audio goes through a streaming MP3 encoder on the
+    way, so encoding overlaps synthesis and no intermediate WAV is needed.
+    A WAV copy is still written to ``wav_file_name`` if one is given.
+    """
+    with ExitStack() as stack:
+        if as_mp3:
+            sink = stack.enter_context(Mp3Encoder(sink))
+        writers = [CrossfadeWriter(sink, QWEN_TTS_CROSSFADE_MS)]
+        if wav_file_name:
+            wav_file = stack.enter_context(open(wav_file_name, "wb"))
+            writers.append(CrossfadeWriter(wav_file, QWEN_TTS_CROSSFADE_MS))
+
+        count = 0
+        for chunk in chunks:
+            for writer in writers:
+                writer.add(chunk)
+            count += 1
+        if not count:
+            raise ValueError("No results returned from transcription.")
+        for writer in writers:
+            writer.close()
+    logger.info(f"Merged {count} chunks")
+
+
+def synthesize_article(article: ParsedArticle) -> t.Iterator[bytes]:
     assert isinstance(article, ParsedArticle), "Input is not a ParsedArticle."
     if not article.text_for_tts:
         raise ValueError(
             "Article has no text for TTS. Did you preprocess it with LLM?"
         )
+    return synthesize(article.text_for_tts)
 
-    article_bytes = text_to_bytes(article.text_for_tts)
-    wav_file_name = f"{target_dir}{article.id}.wav"
-    with open(wav_file_name, "wb") as f:
-        f.write(article_bytes)
 
+def _save_transcription(
+    article: ParsedArticle,
+    chunks: t.Iterable[bytes],
+    target_dir: str,
+    as_mp3: bool,
+    keep_wav: bool,
+) -> str:
+    wav_file_name = f"{target_dir}{article.id}.wav"
     if not as_mp3:
+        with open(wav_file_name, "wb") as f:
+            write_audio(chunks, f, as_mp3=False)
         logger.info(f"Transcription saved to {wav_file_name}")
         return wav_file_name
 
-    mp3_file_name = convert_to_mp3(wav_file_name)
+    mp3_file_name = f"{target_dir}{article.id}.mp3"
+    with open(mp3_file_name, "wb") as f:
+        write_audio(
+            chunks, f, wav_file_name=wav_file_name if keep_wav else None
+        )
     logger.info(f"Transcription saved to {mp3_file_name}")
-
     return mp3_file_name
 
 
-def convert_to_mp3(file_path: str):
-    audio = AudioSegment.from_wav(file_path)
-    file_path = file_path.replace("wav", "mp3")
-    audio.export(file_path, format="mp3")
-    return file_path
+def transcribe_to_file(
+    article: ParsedArticle,
+    target_dir: str = RESULTS_DIR,
+    as_mp3: bool = True,
+    keep_wav: bool = AUDIO_KEEP_WAV,
+) -> str:
+    chunks = synthesize_article(article)
+    return _save_transcription(article, chunks, target_dir, as_mp3, keep_wav)
+
+
+@llm_stream_retry
+def transcribe_stream_to_file(
+    article: ParsedArticle,
+    model: str,
+    use_cache: bool = True,
+    mode: str = LLM_PREPROCESSING_MODE,
+    target_dir: str = RESULTS_DIR,
+    as_mp3: bool = True,
+    keep_wav: bool = AUDIO_KEEP_WAV,
+) -> str:
+    assert isinstance(article, ParsedArticle), "Input is not a ParsedArticle."
+    chunks = synthesize_stream(
+        article.stream_preprocess_with_llm(
+            model, use_cache=use_cache, mode=mode
+        )
+    )
+    return _save_transcription(article, chunks, target_dir, as_mp3, keep_wav)
+
+
+def upload_transcription(
+    article: ParsedArticle,
+    chunks: t.Iterable[bytes],
+    storage: StorageBackend,
+    keep_wav: bool = AUDIO_KEEP_WAV,
+) -> str:
+    """Encode ``chunks`` to MP3 straight into the article's object in
+    ``storage`` and return its key."""
+    key = f"{RESULTS_DIR}{article.id}.mp3"
+    wav_file_name = f"{RESULTS_DIR}{article.id}.wav" if keep_wav else None
+    with storage.open_upload(key) as upload:
+        write_audio(chunks, upload, wav_file_name=wav_file_name)
+    logger.info(f"Uploaded transcription to storage: {key}")
+    return key